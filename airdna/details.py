@@ -0,0 +1,183 @@
+"""
+Per-localidad detail responses: split HAR captures into 'sources/<id>/<detail>.json'
+and consolidate them into 'cleaned/localidades.csv'.
+
+Same rules as 'get_details/parse_har.ipynb' and the bucket notebooks, as plain
+functions so they can be run from scripts, the pipeline and the benchmarks.
+Consolidation reads and writes 'localidades.csv' once for all localidades
+instead of three times per localidad.
+
+Usage:
+    python airdna/details.py har <file.har> [localidad,...]
+    python airdna/details.py consolidate [localidad,...]
+"""
+import json
+import re
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from payloads import DecodeError, decode_json, load_json, read_buckets
+
+AIRDNA_DIR = Path(__file__).resolve().parent
+SOURCES_DIR = AIRDNA_DIR / "sources"
+LOCALIDADES_BASE = SOURCES_DIR / "localidades.csv"
+LOCALIDADES_CSV = AIRDNA_DIR / "cleaned" / "localidades.csv"
+
+DETAILS_TYPES = ["listing_type", "bedrooms", "minimum_stay"]
+
+
+def sanitize_filename(filename):
+    """Convert a string to a safe filename"""
+    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    filename = re.sub(r'[\x00-\x1f\x7f]', '', filename)
+    filename = filename[:100].strip('. ')
+    return filename or "file"
+
+
+def base_localidades(path=LOCALIDADES_BASE):
+    """Ids of the base list of localidades, as strings"""
+    return pd.read_csv(path)['id'].astype('str').tolist()
+
+
+def har_detail_type(entry, localidad, details_types=DETAILS_TYPES):
+    """Detail type of a POST entry whose URL names the localidad, else None (first type found in the URL wins)"""
+    request = entry.get('request', {})
+    if request.get('method', '') != 'POST':
+        return None
+    url = request.get('url', '').lower()
+    if localidad.lower() not in url:
+        return None
+    for detail_type in details_types:
+        if detail_type.lower() in url:
+            return detail_type
+    return None
+
+
+def _next_free_path(folder_path, base_name):
+    counter = 1
+    while True:
+        filename = f"{base_name}.json" if counter == 1 else f"{base_name}_{counter}.json"
+        filepath = folder_path / filename
+        if not filepath.exists():
+            return filepath
+        counter += 1
+
+
+def organize_har(har_file, localidades=None, details_types=DETAILS_TYPES, base_output_dir=SOURCES_DIR,
+                 overwrite=False):
+    """
+    Save the JSON detail responses of a HAR capture as '<base_output_dir>/<localidad>/<detail>.json'.
+
+    Entries that are not JSON or whose URL has no detail type are skipped. Existing
+    files are never overwritten; repeated captures get a '_2', '_3', ... suffix.
+    With overwrite=True the latest capture replaces '<detail>.json' instead, which
+    is the file consolidation reads.
+
+    Returns:
+        dict: {localidad: {detail_type: files_saved}}
+    """
+    localidades = localidades if localidades is not None else base_localidades()
+    har_data = load_json(har_file)
+    entries = har_data.get('log', {}).get('entries', [])
+
+    summary = {}
+    skipped_not_json = 0
+    for localidad in localidades:
+        for entry in entries:
+            detail_type = har_detail_type(entry, localidad, details_types)
+            if detail_type is None:
+                continue
+            content = entry.get('response', {}).get('content', {})
+            if 'json' not in content.get('mimeType', '').lower():
+                skipped_not_json += 1
+                continue
+
+            text = content.get('text', '')
+            try:
+                json_content = decode_json(text) if text else {}
+            except DecodeError:
+                print(f"  ✗ Could not parse JSON from: {entry['request']['url'][:80]}...")
+                continue
+
+            folder_path = Path(base_output_dir) / sanitize_filename(localidad)
+            folder_path.mkdir(parents=True, exist_ok=True)
+            if overwrite:
+                filepath = folder_path / f"{sanitize_filename(detail_type)}.json"
+            else:
+                filepath = _next_free_path(folder_path, sanitize_filename(detail_type))
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(json_content, f, indent=2, ensure_ascii=False)
+
+            files = summary.setdefault(localidad, {})
+            files[detail_type] = files.get(detail_type, 0) + 1
+
+    total_saved = sum(sum(files.values()) for files in summary.values())
+    print(f"{har_file}: {len(entries)} entries, {total_saved} JSON responses saved, "
+          f"{skipped_not_json} skipped (not JSON)")
+    return summary
+
+
+def bucket_columns(localidad_id, sources_dir=SOURCES_DIR):
+    """
+    Read the three detail responses of a localidad into a single row.
+
+    Returns:
+        dict: 'id' plus rent_size_<n>_bedroom, rent_<category> and rent_min_stay_<n>_nights columns
+    """
+    row_data = {'id': int(localidad_id)}
+    column_names = {
+        'bedrooms': lambda bucket: f'rent_size_{bucket.bucket_min}_bedroom' if bucket.bucket_min is not None else None,
+        'listing_type': lambda bucket: f'rent_{bucket.category}',
+        'minimum_stay': lambda bucket: f'rent_min_stay_{bucket.bucket_min}_nights' if bucket.bucket_min is not None else None,
+    }
+    for detail_type, column_name in column_names.items():
+        path = Path(sources_dir) / str(localidad_id) / f"{detail_type}.json"
+        if not path.exists():
+            print(f"  {localidad_id}: missing {detail_type}.json")
+            continue
+        for bucket in read_buckets(path).buckets:
+            name = column_name(bucket)
+            if name is not None:
+                row_data[name] = bucket.value
+    return row_data
+
+
+def consolidate_localidades(localidades=None, sources_dir=SOURCES_DIR, output_csv=LOCALIDADES_CSV, overwrite=False):
+    """
+    Fill 'cleaned/localidades.csv' with the bucket values of every localidad.
+
+    Existing values win over new ones (combine_first), as in the bucket notebooks.
+    With overwrite=True the values read now replace the ones in the file.
+
+    Returns:
+        pandas.DataFrame: The consolidated table, indexed by id
+    """
+    localidades = localidades if localidades is not None else base_localidades()
+    details = pd.DataFrame([bucket_columns(localidad, sources_dir) for localidad in localidades]).set_index('id')
+
+    output_csv = Path(output_csv)
+    if output_csv.exists():
+        consolidate = pd.read_csv(output_csv).set_index('id')
+        if overwrite:
+            merged_df = details.combine_first(consolidate)
+            # Keep the file's column order, new columns at the end
+            merged_df = merged_df[list(consolidate.columns) + [c for c in merged_df.columns if c not in consolidate.columns]]
+        else:
+            merged_df = consolidate.combine_first(details)
+    else:
+        merged_df = details
+    merged_df.to_csv(output_csv)
+    print(f"Localidades updated: {len(details)} -> {output_csv}")
+    return merged_df
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "har" and len(sys.argv) > 2:
+        organize_har(sys.argv[2], sys.argv[3].split(',') if len(sys.argv) > 3 else None)
+    elif command == "consolidate":
+        consolidate_localidades(sys.argv[2].split(',') if len(sys.argv) > 2 else None)
+    else:
+        print("Usage: python airdna/details.py [har <file.har> [ids] | consolidate [ids]]")
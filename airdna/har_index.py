@@ -0,0 +1,258 @@
+"""
+Byte-offset index for HAR captures.
+
+Building the index scans a capture once, over an mmap and without turning the
+bodies into Python objects. It writes a '<capture>.har.index.json' sidecar with the
+byte range of every entry plus its method, URL, status, MIME type, body encoding,
+submarket id and detail type (the last path segment, e.g. 'minimum_stay').
+Lookups read the sidecar, seek to the matching entries and decode only those
+slices, base64 bodies included. The sidecar is rebuilt when the capture's size
+or mtime changes.
+
+Usage:
+    python airdna/har_index.py build <file.har>
+    python airdna/har_index.py list <file.har> [submarket_id] [detail_type]
+    python airdna/har_index.py get <file.har> <submarket_id> <detail_type> [output.json]
+"""
+import base64
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import msgspec
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".index.json"
+
+_SUBMARKET_PATH = re.compile(r"/submarket/(\d+)/(?:.*/)?([A-Za-z_]+)/?$")
+
+
+class HarContent(msgspec.Struct):
+    mimeType: str = ""
+    size: int = -1
+    encoding: str | None = None
+    text: str | None = None
+
+
+class HarContentMeta(msgspec.Struct):
+    """HarContent without the body text, for indexing"""
+    mimeType: str = ""
+    size: int = -1
+    encoding: str | None = None
+
+
+class HarRequest(msgspec.Struct):
+    method: str = ""
+    url: str = ""
+
+
+class HarResponse(msgspec.Struct):
+    status: int = 0
+    content: HarContent = msgspec.field(default_factory=HarContent)
+
+
+class HarResponseMeta(msgspec.Struct):
+    status: int = 0
+    content: HarContentMeta = msgspec.field(default_factory=HarContentMeta)
+
+
+class HarEntry(msgspec.Struct):
+    """The parts of an entry we use; headers, cookies and timings are skipped by the decoder"""
+    request: HarRequest = msgspec.field(default_factory=HarRequest)
+    response: HarResponse = msgspec.field(default_factory=HarResponse)
+
+
+class HarEntryMeta(msgspec.Struct):
+    request: HarRequest = msgspec.field(default_factory=HarRequest)
+    response: HarResponseMeta = msgspec.field(default_factory=HarResponseMeta)
+
+
+class HarLog(msgspec.Struct):
+    entries: list[msgspec.Raw] = []
+
+
+class Har(msgspec.Struct):
+    log: HarLog
+
+
+_har_decoder = msgspec.json.Decoder(Har)
+_entry_decoder = msgspec.json.Decoder(HarEntry)
+_meta_decoder = msgspec.json.Decoder(HarEntryMeta)
+
+
+def entry_ranges(data):
+    """
+    (start, end) byte range and metadata of every entry in 'log.entries'.
+
+    msgspec validates the whole capture in one pass and hands back each entry as
+    the raw bytes it spans, so bodies never become Python strings. Entries follow
+    each other separated by commas and whitespace, which gives their offsets.
+
+    Returns:
+        list: (start, end, HarEntryMeta) per entry, in capture order
+    """
+    raws = _har_decoder.decode(data).log.entries
+    ranges = []
+    pos = data.find(bytes(raws[0])) if raws else -1
+    for raw in raws:
+        start = data.find(b"{", pos)
+        end = start + len(raw)
+        if start < 0 or data[start:end] != memoryview(raw):
+            raise ValueError(f"Could not locate entry {len(ranges)} in the HAR file")
+        ranges.append((start, end, _meta_decoder.decode(raw)))
+        pos = end
+    return ranges
+
+
+def _url_parts(url):
+    match = _SUBMARKET_PATH.search(urlsplit(url).path)
+    return (match.group(1), match.group(2)) if match else (None, None)
+
+
+def index_path(har_file):
+    return Path(f"{har_file}{INDEX_SUFFIX}")
+
+
+def build_index(har_file):
+    """
+    Scan a HAR capture and write its sidecar index.
+
+    Returns:
+        dict: The index ('entries' holds one record per HAR entry)
+    """
+    har_file = Path(har_file)
+    start_time = time.perf_counter()
+    stat = har_file.stat()
+    records = []
+    with open(har_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for number, (start, end, meta) in enumerate(entry_ranges(data)):
+            content = meta.response.content
+            submarket_id, detail_type = _url_parts(meta.request.url)
+            records.append({
+                'entry': number,
+                'start': start,
+                'end': end,
+                'method': meta.request.method,
+                'url': meta.request.url,
+                'status': meta.response.status,
+                'mime_type': content.mimeType,
+                'encoding': content.encoding,
+                'size': content.size,
+                'submarket_id': submarket_id,
+                'detail_type': detail_type,
+            })
+
+    index = {
+        'version': INDEX_VERSION,
+        'har_size': stat.st_size,
+        'har_mtime_ns': stat.st_mtime_ns,
+        'entries': records,
+    }
+    tmp = index_path(har_file).with_suffix(".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path(har_file))
+    print(f"Indexed {len(records)} entries of {har_file} ({stat.st_size / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start_time:.2f}s")
+    return index
+
+
+def load_index(har_file):
+    """The sidecar index of a capture, rebuilt first if it is missing or out of date"""
+    har_file = Path(har_file)
+    sidecar = index_path(har_file)
+    if sidecar.exists():
+        with open(sidecar, 'rb') as f:
+            index = msgspec.json.decode(f.read())
+        stat = har_file.stat()
+        if (index.get('version') == INDEX_VERSION and index.get('har_size') == stat.st_size
+                and index.get('har_mtime_ns') == stat.st_mtime_ns):
+            return index
+    return build_index(har_file)
+
+
+def find_entries(har_file, submarket_id=None, detail_type=None, method=None, status=None, url_contains=None):
+    """
+    Index records of the entries matching every given filter.
+
+    Returns:
+        list: Index records in capture order
+    """
+    matches = []
+    for record in load_index(har_file)['entries']:
+        if submarket_id is not None and record['submarket_id'] != str(submarket_id):
+            continue
+        if detail_type is not None and record['detail_type'] != detail_type:
+            continue
+        if method is not None and record['method'] != method.upper():
+            continue
+        if status is not None and record['status'] != status:
+            continue
+        if url_contains is not None and url_contains not in record['url']:
+            continue
+        matches.append(record)
+    return matches
+
+
+def read_entry(har_file, record):
+    """Seek to an indexed entry and decode just that entry (request URL/method, response status/content)"""
+    with open(har_file, 'rb') as f:
+        f.seek(record['start'])
+        return _entry_decoder.decode(f.read(record['end'] - record['start']))
+
+
+def response_body(har_file, record):
+    """Raw response body of an indexed entry, base64-decoded when the capture stored it that way"""
+    content = read_entry(har_file, record).response.content
+    text = content.text or ""
+    if content.encoding == "base64":
+        return base64.b64decode(text)
+    return text.encode('utf-8')
+
+
+def response_json(har_file, record):
+    """Response body of an indexed entry decoded as JSON"""
+    return msgspec.json.decode(response_body(har_file, record))
+
+
+def get_response(har_file, submarket_id, detail_type, method="POST"):
+    """
+    JSON response of the last matching capture of one detail for one submarket.
+
+    Returns:
+        Decoded JSON, or None when the capture has no such response
+    """
+    matches = [r for r in find_entries(har_file, submarket_id, detail_type, method) if 'json' in r['mime_type']]
+    return response_json(har_file, matches[-1]) if matches else None
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "build" and len(sys.argv) > 2:
+        build_index(sys.argv[2])
+    elif command == "list" and len(sys.argv) > 2:
+        for record in find_entries(sys.argv[2], *sys.argv[3:5]):
+            print(f"{record['entry']:>5} {record['method']:<7} {record['status']} "
+                  f"{record['end'] - record['start']:>9} B  {record['url']}")
+    elif command == "get" and len(sys.argv) > 4:
+        start = time.perf_counter()
+        data = get_response(sys.argv[2], sys.argv[3], sys.argv[4])
+        elapsed = time.perf_counter() - start
+        if data is None:
+            print(f"No {sys.argv[4]} response for submarket {sys.argv[3]}")
+            sys.exit(1)
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+        if len(sys.argv) > 5:
+            with open(sys.argv[5], 'w', encoding='utf-8') as f:
+                f.write(text)
+            print(f"Saved to {sys.argv[5]} ({elapsed * 1000:.1f} ms lookup)")
+        else:
+            print(text)
+    else:
+        print("Usage: python airdna/har_index.py [build <file.har> | list <file.har> [id] [detail] "
+              "| get <file.har> <id> <detail> [output.json]]")
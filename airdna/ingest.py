@@ -0,0 +1,162 @@
+"""
+Parallel ingest of AirDNA listing pages.
+
+Each '{localidad}_{offset}.json' page is parsed in a worker process into an
+Arrow record batch with the canonical listing schema. The parent only stitches
+batches into tables (no copy) and writes the cleaned CSVs straight from Arrow,
+so a full re-ingest of 'sources/listings' scales with the number of cores.
+
+Usage:
+    python airdna/ingest.py [max_workers]
+"""
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from payloads import listing_columns
+from schema import LISTING_ARROW_SCHEMA, apply_listing_schema
+from search import build_title_index
+
+AIRDNA_DIR = Path(__file__).resolve().parent
+LISTINGS_DIR = AIRDNA_DIR / "sources" / "listings"
+CLEANED_DIR = AIRDNA_DIR / "cleaned"
+
+PAGE_FILE_PATTERN = re.compile(r"^(\d+)(?:_(\d+))?\.json$")
+
+
+def group_page_files(listings_dir=LISTINGS_DIR, localidades=None):
+    """Group listing page files by localidad, sorted by offset"""
+    wanted = {str(localidad) for localidad in localidades} if localidades is not None else None
+    pages = {}
+    for path in Path(listings_dir).iterdir():
+        match = PAGE_FILE_PATTERN.match(path.name)
+        if not match or (wanted is not None and match.group(1) not in wanted):
+            continue
+        localidad, offset = match.group(1), int(match.group(2) or 0)
+        pages.setdefault(localidad, []).append((offset, path))
+    return {localidad: [path for _, path in sorted(files)] for localidad, files in sorted(pages.items())}
+
+
+def read_page_batch(file_path, section):
+    """Parse one listings page into an Arrow record batch, dropping images and flattening location"""
+    return pa.RecordBatch.from_pydict(listing_columns(file_path, section), schema=LISTING_ARROW_SCHEMA)
+
+
+def read_listing_tables(localidades=None, listings_dir=LISTINGS_DIR, max_workers=None):
+    """
+    Parse every page in parallel, one task per page file.
+
+    Args:
+        localidades (list): Localidad ids to read. Defaults to every localidad in the folder.
+        listings_dir (Path): Folder with the raw pages
+        max_workers (int): Worker processes. Defaults to the number of cores. 1 parses in this process.
+
+    Returns:
+        dict: Localidad id -> pyarrow.Table with its listings in offset order
+    """
+    pages = group_page_files(listings_dir, localidades)
+    paths = [path for files in pages.values() for path in files]
+    sections = [localidad for localidad, files in pages.items() for _ in files]
+    if not paths:
+        return {}
+
+    if max_workers == 1:
+        batches = list(map(read_page_batch, paths, sections))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            batches = list(executor.map(read_page_batch, paths, sections, chunksize=4))
+
+    tables = {}
+    for localidad, batch in zip(sections, batches):
+        tables.setdefault(localidad, []).append(batch)
+    return {localidad: drop_duplicate_listings(pa.Table.from_batches(parts, schema=LISTING_ARROW_SCHEMA))
+            for localidad, parts in tables.items()}
+
+
+def drop_duplicate_listings(table):
+    """
+    Keep the first row of each property_id.
+
+    Pages saved by runs with different page sizes can cover overlapping offset
+    ranges, which would otherwise count the same listings twice.
+    """
+    seen = set()
+    keep = []
+    for i, property_id in enumerate(table['property_id'].to_pylist()):
+        if property_id not in seen:
+            seen.add(property_id)
+            keep.append(i)
+    if len(keep) == table.num_rows:
+        return table
+    return table.take(keep)
+
+
+def write_listing_csvs(tables, cleaned_dir=CLEANED_DIR):
+    """Write one 'cleaned/listings/{localidad}.csv' per table"""
+    output_dir = Path(cleaned_dir) / "listings"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for localidad, table in tables.items():
+        pa_csv.write_csv(table, output_dir / f"{localidad}.csv")
+        print(f"  {localidad}: {table.num_rows} listings")
+
+
+def combine_listing_csvs(localidades, cleaned_dir=CLEANED_DIR):
+    """
+    Rebuild 'cleaned/all_listings.csv' by concatenating the per-localidad CSVs.
+
+    Gives the same bytes as writing the combined table, without parsing anything,
+    so only the localidades whose pages changed have to be ingested again.
+    """
+    output_dir = Path(cleaned_dir) / "listings"
+    header_written = False
+    with open(Path(cleaned_dir) / "all_listings.csv", 'wb') as out:
+        for localidad in localidades:
+            path = output_dir / f"{localidad}.csv"
+            if not path.exists():
+                continue
+            with open(path, 'rb') as f:
+                header = f.readline()
+                if not header_written:
+                    out.write(header)
+                    header_written = True
+                shutil.copyfileobj(f, out)
+
+
+def ingest_listings(localidades=None, listings_dir=LISTINGS_DIR, cleaned_dir=CLEANED_DIR, max_workers=None):
+    """
+    Rebuild 'cleaned/listings/{localidad}.csv', 'cleaned/all_listings.csv' and the title index from the raw pages.
+
+    Returns:
+        pyarrow.Table: All listings, localidades in the order they were requested
+    """
+    start = time.perf_counter()
+    tables = read_listing_tables(localidades, listings_dir, max_workers)
+    if not tables:
+        print("No data to save")
+        return pa.table({}, schema=LISTING_ARROW_SCHEMA)
+
+    write_listing_csvs(tables, cleaned_dir)
+
+    order = [str(localidad) for localidad in localidades] if localidades is not None else list(tables)
+    combined = pa.concat_tables([tables[localidad] for localidad in order if localidad in tables])
+    pa_csv.write_csv(combined, Path(cleaned_dir) / "all_listings.csv")
+    build_title_index(cleaned_dir)
+
+    print(f"Ingested {combined.num_rows} listings from {len(tables)} localidades "
+          f"in {time.perf_counter() - start:.2f}s")
+    return combined
+
+
+def to_listings_frame(table, compact_floats=True):
+    """Convert an ingested Arrow table to a pandas DataFrame with the canonical schema"""
+    return apply_listing_schema(table.to_pandas(), compact_floats=compact_floats)
+
+
+if __name__ == "__main__":
+    ingest_listings(max_workers=int(sys.argv[1]) if len(sys.argv) > 1 else None)
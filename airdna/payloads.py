@@ -0,0 +1,182 @@
+"""
+Shared reader for raw AirDNA payloads.
+
+Decodes with msgspec instead of the stdlib json module. Listing pages and
+bucket responses are decoded into typed structs that only declare the fields
+we keep, so large unused chunks like 'images' are skipped by the decoder
+instead of being turned into Python objects and thrown away.
+
+Usage:
+    python airdna/payloads.py bench [file ...]
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+import msgspec
+
+AIRDNA_DIR = Path(__file__).resolve().parent
+LISTINGS_DIR = AIRDNA_DIR / "sources" / "listings"
+
+DecodeError = msgspec.DecodeError
+
+
+class Location(msgspec.Struct):
+    lat: float | None = None
+    lng: float | None = None
+
+
+class Listing(msgspec.Struct):
+    property_id: str
+    airbnb_property_id: str | None = None
+    vrbo_property_id: str | None = None
+    listing_type: str | None = None
+    bedrooms: int | None = None
+    bathrooms: float | None = None
+    accommodates: int | None = None
+    rating: float | None = None
+    reviews: int | None = None
+    title: str | None = None
+    revenue_ltm: float | None = None
+    revenue_potential_ltm: float | None = None
+    occupancy_rate_ltm: float | None = None
+    average_daily_rate_ltm: float | None = None
+    days_available_ltm: int | None = None
+    market_id: str | None = None
+    market_name: str | None = None
+    currency: str | None = None
+    address_match_confidence: str | None = None
+    location: Location | None = None
+
+
+class Pagination(msgspec.Struct):
+    offset: int = 0
+    page_size: int = 0
+
+
+class ListingsPayload(msgspec.Struct):
+    listings: list[Listing] = []
+    pagination: Pagination | None = None
+
+
+class ListingsDocument(msgspec.Struct):
+    payload: ListingsPayload
+
+
+class Bucket(msgspec.Struct):
+    bucket_min: int | None = None
+    category: str | None = None
+    value: int | float | None = None
+
+
+class BucketsPayload(msgspec.Struct):
+    submarket_id: str | None = None
+    buckets: list[Bucket] = []
+
+
+class BucketsDocument(msgspec.Struct):
+    payload: BucketsPayload
+
+
+LISTING_FIELDS = [f for f in Listing.__struct_fields__ if f != 'location']
+
+# strict=False lets '141029' and 141029 both decode into the declared type
+_listings_decoder = msgspec.json.Decoder(ListingsDocument, strict=False)
+_buckets_decoder = msgspec.json.Decoder(BucketsDocument, strict=False)
+_generic_decoder = msgspec.json.Decoder()
+
+
+def _read_bytes(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def load_json(file_path):
+    """Decode any JSON file (HAR captures, GeoJSON, localidades.json) into Python objects"""
+    return _generic_decoder.decode(_read_bytes(file_path))
+
+
+def decode_json(text):
+    """Decode a JSON string or bytes into Python objects"""
+    return _generic_decoder.decode(text)
+
+
+def read_listings(file_path):
+    """Decode a listings page into typed structs, skipping every field not declared in Listing"""
+    return decode_listings(_read_bytes(file_path))
+
+
+def decode_listings(body):
+    """Decode the raw bytes of a listings page into typed structs; raises DecodeError if it is not one"""
+    return _listings_decoder.decode(body).payload
+
+
+def read_buckets(file_path):
+    """Decode a bedrooms/listing_type/minimum_stay response into typed structs"""
+    return _buckets_decoder.decode(_read_bytes(file_path)).payload
+
+
+def listing_columns(file_path, section):
+    """
+    Decode a listings page into columns, with location flattened to lat/lng.
+
+    Returns:
+        dict: Column name -> list of values, ready for pyarrow.RecordBatch.from_pydict
+    """
+    listings = read_listings(file_path).listings
+    columns = {field: [getattr(listing, field) for listing in listings] for field in LISTING_FIELDS}
+    columns['lat'] = [listing.location.lat if listing.location else None for listing in listings]
+    columns['lng'] = [listing.location.lng if listing.location else None for listing in listings]
+    columns['section'] = [section] * len(listings)
+    return columns
+
+
+def _stdlib_listing_rows(file_path, section):
+    """The original notebook path: full json.load, then drop images and flatten location per listing"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    rows = []
+    for listing in data['payload']['listings']:
+        row = {k: v for k, v in listing.items() if k != 'images'}
+        if 'location' in row and isinstance(row['location'], dict):
+            row['lat'] = row['location'].get('lat')
+            row['lng'] = row['location'].get('lng')
+            del row['location']
+        row['section'] = section
+        rows.append(row)
+    return rows
+
+
+def benchmark(paths=None, repeat=3):
+    """
+    Compare the stdlib path with the typed msgspec path on the given listing pages.
+
+    Returns:
+        dict: Best total seconds per path and the speedup
+    """
+    paths = [Path(p) for p in paths] if paths else sorted(LISTINGS_DIR.glob("*.json"))
+    total_mb = sum(p.stat().st_size for p in paths) / 1e6
+    print(f"Benchmarking {len(paths)} files ({total_mb:.1f} MB), best of {repeat}")
+
+    results = {}
+    for name, reader in (('stdlib json', _stdlib_listing_rows), ('msgspec typed', listing_columns)):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for path in paths:
+                reader(path, path.stem.split('_')[0])
+            timings.append(time.perf_counter() - start)
+        results[name] = min(timings)
+        print(f"  {name:<15} {results[name]:.3f}s  ({total_mb / results[name]:.0f} MB/s)")
+
+    results['speedup'] = results['stdlib json'] / results['msgspec typed']
+    print(f"  speedup: {results['speedup']:.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(sys.argv[2:])
+    else:
+        print("Usage: python airdna/payloads.py bench [file ...]")
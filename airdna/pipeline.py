@@ -0,0 +1,323 @@
+"""
+Incremental pipeline from raw captures to the cleaned CSVs.
+
+Replaces running parse_har.ipynb -> iterate_localidades.ipynb -> get_listings.ipynb
+by hand. Each stage lists its inputs in units (a HAR file, a localidad's detail
+responses, a localidad's listing pages) and the content hash of every unit is
+kept in '.pipeline_state.json'. A stage only reprocesses the units whose hash
+changed since its last successful run, and is skipped when nothing changed and
+its outputs exist.
+
+Unlike the notebooks, a new capture replaces '<id>/<detail>.json' and its values
+replace the ones in 'cleaned/localidades.csv', so refreshed data flows through.
+HAR files are processed oldest capture first, so the newest one always wins.
+
+    har ──> details                 (sources/har/*.har -> sources/<id>/*.json -> cleaned/localidades.csv)
+    listings ──> snapshot           (sources/listings/* -> cleaned/listings/*.csv + title index, history/listings/<date>/)
+
+Stages whose dependencies are done run in parallel, so the two chains above
+overlap.
+
+Usage:
+    python airdna/pipeline.py [status] [--force stage,...] [--only stage,...] [--workers N]
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable
+
+from details import DETAILS_TYPES, LOCALIDADES_CSV, SOURCES_DIR, base_localidades, consolidate_localidades, organize_har
+from ingest import CLEANED_DIR, LISTINGS_DIR, combine_listing_csvs, group_page_files, read_listing_tables, write_listing_csvs
+from search import INDEX_PATH, build_title_index
+from snapshots import HISTORY_DIR, ingest_snapshot, list_snapshots
+
+AIRDNA_DIR = Path(__file__).resolve().parent
+STATE_FILE = AIRDNA_DIR / ".pipeline_state.json"
+HAR_DIR = SOURCES_DIR / "har"
+
+
+# ---------- content hashes ----------
+
+class FileHasher:
+    """
+    SHA-1 of file contents, reusing the previous hash when size and mtime are unchanged.
+
+    Files are only read when they are new or were touched, so checking a folder of
+    unchanged captures costs one stat() per file.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = dict(cache or {})
+        self.lock = threading.Lock()
+
+    def file_hash(self, path):
+        stat = path.stat()
+        key = str(path.resolve())
+        with self.lock:
+            cached = self.cache.get(key)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha1']
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        with self.lock:
+            self.cache[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.cache)
+
+    def unit_hash(self, paths):
+        """Hash of a unit: the names and contents of its files"""
+        digest = hashlib.sha1()
+        for path in sorted(paths):
+            digest.update(path.name.encode('utf-8'))
+            digest.update(self.file_hash(path).encode('ascii'))
+        return digest.hexdigest()
+
+
+# ---------- stages ----------
+
+@dataclass
+class Stage:
+    """
+    A pipeline step.
+
+    inputs() returns {unit: [files]}; run(stale_units, all_units) rebuilds the outputs of
+    the stale units and returns False if the work should be retried on the next run.
+    """
+    name: str
+    inputs: Callable
+    outputs: Callable
+    run: Callable
+    deps: list = field(default_factory=list)
+
+
+def har_inputs():
+    return {path.name: [path] for path in sorted(HAR_DIR.glob("*.har"))}
+
+
+_STARTED = re.compile(rb'"startedDateTime"\s*:\s*"([^"]+)"')
+
+
+def har_capture_time(path, head_bytes=1 << 16):
+    """
+    When a HAR capture started, as a POSIX timestamp.
+
+    Uses the first 'startedDateTime' (the first page, or the first entry),
+    which sits at the top of the file, and falls back to the file's mtime.
+    """
+    with open(path, 'rb') as f:
+        match = _STARTED.search(f.read(head_bytes))
+    if match:
+        try:
+            return datetime.fromisoformat(match.group(1).decode()).timestamp()
+        except ValueError:
+            pass
+    return path.stat().st_mtime
+
+
+def run_har(stale, units):
+    # Each capture overwrites the detail files, so the newest capture has to go last. A stale
+    # capture older than ones already applied would overwrite their data, so every capture
+    # from the oldest stale one on is replayed in capture order.
+    captures = sorted(units, key=lambda name: har_capture_time(HAR_DIR / name))
+    first = min(captures.index(name) for name in stale)
+    for name in captures[first:]:
+        organize_har(HAR_DIR / name, overwrite=True)
+
+
+def details_inputs():
+    units = {}
+    for localidad in base_localidades():
+        units[localidad] = [p for p in (SOURCES_DIR / localidad / f"{d}.json" for d in DETAILS_TYPES) if p.exists()]
+    return units
+
+
+def run_details(stale, units):
+    consolidate_localidades(stale, overwrite=True)
+
+
+def listings_inputs():
+    return group_page_files(LISTINGS_DIR)
+
+
+def listings_outputs():
+    return [CLEANED_DIR / "all_listings.csv", INDEX_PATH]
+
+
+def run_listings(stale, units):
+    write_listing_csvs(read_listing_tables(stale), CLEANED_DIR)
+    combine_listing_csvs(list(units), CLEANED_DIR)
+    build_title_index(CLEANED_DIR)
+
+
+def snapshot_inputs():
+    # One unit: any change to the listings makes a new snapshot
+    return {'listings': [path for files in group_page_files(LISTINGS_DIR).values() for path in files]}
+
+
+def run_snapshot(stale, units):
+    today = date.today().isoformat()
+    if today in list_snapshots(HISTORY_DIR):
+        print(f"Snapshot {today} already exists; the change will go into the next day's snapshot")
+        return False
+    ingest_snapshot(today)
+    # Titles from the new snapshot become searchable
+    build_title_index(CLEANED_DIR)
+
+
+STAGES = {
+    'har': Stage('har', har_inputs, lambda: [], run_har),
+    'details': Stage('details', details_inputs, lambda: [LOCALIDADES_CSV], run_details, deps=['har']),
+    'listings': Stage('listings', listings_inputs, listings_outputs, run_listings),
+    'snapshot': Stage('snapshot', snapshot_inputs, lambda: [], run_snapshot, deps=['listings']),
+}
+
+
+# ---------- runner ----------
+
+def load_state(path=STATE_FILE):
+    if not Path(path).exists():
+        return {'files': {}, 'stages': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    tmp = Path(path).with_suffix(".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    tmp.replace(path)
+
+
+def stale_units(stage, hasher, state, force=False):
+    """
+    Units of a stage whose inputs changed since its last successful run.
+
+    Returns:
+        tuple: (stale units, {unit: hash} for every current unit)
+    """
+    hashes = {unit: hasher.unit_hash(paths) for unit, paths in stage.inputs().items()}
+    previous = state['stages'].get(stage.name, {})
+    outputs_missing = any(not Path(p).exists() for p in stage.outputs())
+    if force or outputs_missing:
+        return list(hashes), hashes
+    return [unit for unit, h in hashes.items() if previous.get(unit) != h], hashes
+
+
+def run_stage(stage, hasher, state, lock, force=False):
+    start = time.perf_counter()
+    stale, hashes = stale_units(stage, hasher, state, force)
+    if not stale:
+        return {'stage': stage.name, 'status': 'fresh', 'units': len(hashes), 'stale': 0,
+                'seconds': time.perf_counter() - start}
+
+    print(f"[{stage.name}] {len(stale)}/{len(hashes)} units changed")
+    done = stage.run(stale, hashes) is not False
+    if done:
+        with lock:
+            state['stages'][stage.name] = hashes
+            state['files'] = hasher.snapshot()
+            save_state(state)
+    return {'stage': stage.name, 'status': 'ran' if done else 'deferred', 'units': len(hashes),
+            'stale': len(stale), 'seconds': time.perf_counter() - start}
+
+
+def run_pipeline(only=None, force=(), workers=4):
+    """
+    Run the stages (and the stages they depend on) that have stale inputs.
+
+    Args:
+        only (list): Stage names to run. Defaults to every stage.
+        force (list): Stage names to rebuild from scratch.
+        workers (int): Stages run at the same time
+
+    Returns:
+        list: One dict per stage with status ('ran', 'fresh', 'deferred', 'failed'), units and seconds
+    """
+    wanted = set(only or STAGES)
+    for name in list(wanted):
+        wanted.update(STAGES[name].deps)
+
+    state = load_state()
+    hasher = FileHasher(state.get('files'))
+    lock = threading.Lock()
+    results, finished, failed = [], set(), set()
+    pending = {name: STAGES[name] for name in STAGES if name in wanted}
+    running = {}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if any(dep in failed for dep in stage.deps if dep in wanted):
+                    del pending[name]
+                    failed.add(name)
+                    results.append({'stage': name, 'status': 'skipped', 'units': 0, 'stale': 0, 'seconds': 0.0})
+                elif all(dep in finished or dep not in wanted for dep in stage.deps):
+                    del pending[name]
+                    running[executor.submit(run_stage, stage, hasher, state, lock, name in force)] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results.append(future.result())
+                    finished.add(name)
+                except Exception as e:
+                    print(f"[{name}] failed: {type(e).__name__}: {e}")
+                    results.append({'stage': name, 'status': 'failed', 'units': 0, 'stale': 0, 'seconds': 0.0})
+                    failed.add(name)
+
+    print(f"\n{'stage':<10} {'status':<9} {'changed':>9} {'seconds':>8}")
+    for result in results:
+        print(f"{result['stage']:<10} {result['status']:<9} "
+              f"{result['stale']:>4}/{result['units']:<4} {result['seconds']:>8.2f}")
+    print(f"Pipeline finished in {time.perf_counter() - start:.2f}s")
+    return results
+
+
+def pipeline_status():
+    """Print how many units of every stage are stale, without running anything"""
+    state = load_state()
+    hasher = FileHasher(state.get('files'))
+    for stage in STAGES.values():
+        stale, hashes = stale_units(stage, hasher, state)
+        print(f"{stage.name:<10} {len(stale)}/{len(hashes)} units changed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the cleaned data from the raw captures, incrementally")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "status"])
+    parser.add_argument("--only", help=f"Comma-separated stages to run (with their dependencies): {list(STAGES)}")
+    parser.add_argument("--force", default="", help="Comma-separated stages to rebuild from scratch")
+    parser.add_argument("--workers", type=int, default=4, help="Stages run at the same time")
+    args = parser.parse_args()
+
+    only = args.only.split(",") if args.only else None
+    force = [name for name in args.force.split(",") if name]
+    unknown = [name for name in (only or []) + force if name not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {unknown}. Available: {list(STAGES)}")
+
+    if args.command == "status":
+        pipeline_status()
+        return
+    results = run_pipeline(only, force, args.workers)
+    if any(result['status'] == 'failed' for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
 import asyncio
+import copy
 import json
 import os
 import sys
 from datetime import datetime
 from playwright.async_api import async_playwright
 
+from page_writer import PageWriter
+from pagination import REQUEST_TIMEOUT, PaginationController
+
+OUTCOMES_FOLDER = "airdna/sources/scrape_log"
+# Point these at the local stand-in (scrapping/stand_in.py) to test without the real site
+APP_URL = os.environ.get("AIRDNA_APP_URL", "https://app.airdna.co").rstrip("/")
+HEADLESS = os.environ.get("AIRDNA_HEADLESS", "") not in ("", "0")
+
 
 async def main():
     browsers = ['chromium', 'firefox', 'webkit']
@@ -12,9 +21,9 @@ async def main():
     limit = int(sys.argv[2]) if len(sys.argv) > 2 else 100
     initial_offset = int(sys.argv[3]) if len(sys.argv) > 3 else 0
     async with async_playwright() as p:
-            browser = await p.firefox.launch(headless=False)
+            browser = await p.firefox.launch(headless=HEADLESS)
             page = await browser.new_page()
-            await page.goto('https://app.airdna.co')
+            await page.goto(APP_URL)
             
             try:
                 login_link = page.get_by_role("link", name="Log in")
@@ -31,100 +40,70 @@ async def main():
             await page.screenshot(path=f'py_firefoxa.png', full_page=True)
             
             url_pattern = f"/submarket/{localidad}/listings"
-            response_received = asyncio.Event()
-            request_to_offset = {}
-            current_offset = initial_offset
-            page_size = 100
-            total_fetched = 0 + initial_offset
+            listings_request = {}
+            request_captured = asyncio.Event()
             responses_folder = f"airdna/sources/listings"
             os.makedirs(responses_folder, exist_ok=True)
+            # Pages are validated and written in background threads so the browser keeps fetching
+            writer = PageWriter(responses_folder)
+            writer.start()
             
-            async def modify_request(route, request):
-                nonlocal current_offset, total_fetched
-                if url_pattern in request.url and request.method == "POST":
-                    if total_fetched >= limit:
-                        await route.continue_()
-                        return
-                    
-                    print(">> Intercepted:", request.method, request.url)
-                    post_data = request.post_data
-                    if post_data:
-                        try:
-                            data = json.loads(post_data)
-                            print(f"Original data (offset: {data.get('pagination', {}).get('offset', 'unknown')}):", json.dumps(data, indent=2))
-                            
-                            remaining = limit - total_fetched
-                            batch_size = min(page_size, remaining)
-                            
-                            offset_for_this_request = current_offset
-                            data["pagination"]["offset"] = offset_for_this_request
-                            data["pagination"]["page_size"] = batch_size
-                            
-                            request_to_offset[request] = offset_for_this_request
-                            
-                            modified_data = json.dumps(data)
-                            print(f"Modified data (offset: {offset_for_this_request}, size: {batch_size}):", json.dumps(data, indent=2))
-                            
-                            current_offset += batch_size
-                            total_fetched += batch_size
-                            
-                            await route.continue_(post_data=modified_data)
-                        except Exception as e:
-                            print("Error modifying request:", e)
-                            await route.continue_()
-                    else:
-                        await route.continue_()
-                else:
-                    await route.continue_()
-            
-            async def log_response(response):
-                nonlocal total_fetched
-                if response.request in request_to_offset:
-                    offset = request_to_offset[response.request]
-                    print("<<", response.status, response.url)
+            # The listings page sends the first POST itself; keep its URL, headers and body as a template
+            async def capture_request(route, request):
+                if url_pattern in request.url and request.method == "POST" and not request_captured.is_set():
+                    print(">> Captured:", request.method, request.url)
                     try:
-                        body = await response.body()
-                        body_text = body.decode('utf-8')
-                        json_data = json.loads(body_text)
-                        filename = os.path.join(responses_folder, f"{localidad}_{offset}.json")
-                        with open(filename, 'w', encoding='utf-8') as f:
-                            json.dump(json_data, f, indent=2, ensure_ascii=False)
-                        print(f"Response saved to {filename}")
-                        print(f"Total fetched so far: {total_fetched}/{limit}")
-                        
-                        if total_fetched >= limit:
-                            print(f"Reached limit of {limit} items. Stopping interception.")
-                            await page.unroute("**/*", modify_request)
-                            response_received.set()
-                        else:
-                            response_received.set()
-
+                        listings_request['url'] = request.url
+                        listings_request['headers'] = {
+                            name: value for name, value in (await request.all_headers()).items()
+                            if not name.startswith(':') and name not in ('content-length', 'host', 'cookie')
+                        }
+                        listings_request['data'] = json.loads(request.post_data or '{}')
+                        request_captured.set()
                     except Exception as e:
-                        print("Error reading response:", e)
-                        response_received.set()
+                        print("Error capturing request:", e)
+                await route.continue_()
             
-            await page.route("**/*", modify_request)
-            page.on("response", log_response)
-            await page.goto(f'https://app.airdna.co/data/co/12/{localidad}/top-listings')
-            await page.wait_for_load_state("networkidle")
+            await page.route("**/*", capture_request)
+            await page.goto(f'{APP_URL}/data/co/12/{localidad}/top-listings')
+            try:
+                await asyncio.wait_for(request_captured.wait(), timeout=60.0)
+            except asyncio.TimeoutError:
+                print("Timeout waiting for the listings request. Browser may need user interaction to trigger it.")
+                await writer.close()
+                return
+            await page.unroute("**/*", capture_request)
             
-            print(f"Waiting for responses. Target: {limit} items")
-            while total_fetched < limit:
-                response_received.clear()
-                try:
-                    await asyncio.wait_for(response_received.wait(), timeout=60.0)
-                    if total_fetched >= limit:
-                        break
-                    await page.wait_for_timeout(1000)
-                except asyncio.TimeoutError:
-                    print("Timeout waiting for next response. Browser may need user interaction to trigger more requests.")
-                    break
+            # Same request with our own pagination, sent through the browser context so it keeps the session cookies
+            async def fetch_page(offset, page_size):
+                data = copy.deepcopy(listings_request['data'])
+                data.setdefault("pagination", {})
+                data["pagination"]["offset"] = offset
+                data["pagination"]["page_size"] = page_size
+                response = await page.context.request.post(
+                    listings_request['url'],
+                    headers=listings_request['headers'],
+                    data=json.dumps(data),
+                    timeout=REQUEST_TIMEOUT * 1000,
+                )
+                return response.status, await response.body(), response.headers
             
-            await page.wait_for_timeout(2000)
-            print(f"Script finished. Fetched {total_fetched}/{limit} items. Browser will remain open.")
+            outcomes_path = os.path.join(OUTCOMES_FOLDER, f"{localidad}_{datetime.now():%Y%m%d-%H%M%S}.jsonl")
+            controller = PaginationController(
+                fetch_page, lambda offset, body: writer.put(localidad, offset, body),
+                start_offset=initial_offset,
+                limit=limit if limit > 0 else sys.maxsize,
+                outcomes_path=outcomes_path,
+            )
+            print(f"Fetching listings. Target: {limit if limit > 0 else 'whole section'} items from offset {initial_offset}")
+            result = await controller.run()
+            await writer.close()
+            
+            print(f"Script finished. Fetched {result['fetched']} items"
+                  + (f", section ends at offset {result['end_offset']}" if result['end_offset'] is not None else ""))
+            if result['failed_offsets']:
+                print(f"Offsets that failed every retry: {result['failed_offsets']}")
+            print(f"Per-offset outcomes: {outcomes_path}")
             # await browser.close()
 
 asyncio.run(main())
-
-
-
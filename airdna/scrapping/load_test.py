@@ -0,0 +1,160 @@
+"""
+Load test for the listings scraper against the local stand-in (stand_in.py).
+
+Runs get_listings_per_section.py (headless, in a scratch folder so the real
+'sources/listings/' is never touched) against a stand-in for each fault
+scenario. Reports wall time, throughput, retries and the final page size and
+concurrency from the scraper's per-offset log, and checks that every recorded
+listing came back. Exits with an error if any scenario lost listings.
+
+--direct skips the browser and drives PaginationController and PageWriter over
+plain HTTP, so the paging logic can be benchmarked without Playwright.
+
+Usage:
+    python airdna/scrapping/load_test.py [localidad] [--scenarios clean,flaky] [--direct]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+from pathlib import Path
+
+from stand_in import Faults, start_server
+
+SCRAPER = Path(__file__).resolve().parent / "get_listings_per_section.py"
+
+SCENARIOS = {
+    'clean': Faults(latency=0.05),
+    'slow_big_pages': Faults(latency=0.1, latency_per_listing=0.05, jitter=0.2),
+    'flaky': Faults(latency=0.05, error_rate=0.15, truncate_rate=0.05, jitter=0.3),
+    'rate_limited': Faults(latency=0.05, rate_limit=3),
+    'overloaded': Faults(latency=0.2, capacity=2),
+    'page_cap': Faults(latency=0.05, max_page_size=50),
+}
+
+
+def run_scraper(server, localidad, workdir, timeout):
+    """Run the real scraper against the stand-in with workdir as its working directory"""
+    env = {**os.environ, 'AIRDNA_APP_URL': server.url, 'AIRDNA_HEADLESS': '1'}
+    subprocess.run([sys.executable, str(SCRAPER), str(localidad), "0", "0"], cwd=workdir, env=env,
+                   timeout=timeout, check=True, stdout=subprocess.DEVNULL)
+
+
+def run_direct(server, localidad, workdir):
+    """Drive PaginationController and PageWriter over urllib, like the scraper does through the browser"""
+    from page_writer import PageWriter
+    from pagination import PaginationController
+
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+    opener.open(urllib.request.Request(f"{server.url}/login", data=b"email=a&password=b"))
+    url = f"{server.url}/api/explorer/v2/submarket/{localidad}/listings"
+
+    def post(offset, page_size):
+        data = json.dumps({'filters': [], 'pagination': {'offset': offset, 'page_size': page_size}}).encode()
+        request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+        try:
+            with opener.open(request) as response:
+                return response.status, response.read(), {k.lower(): v for k, v in response.headers.items()}
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), {k.lower(): v for k, v in e.headers.items()}
+
+    async def fetch(offset, page_size):
+        return await asyncio.to_thread(post, offset, page_size)
+
+    async def main():
+        listings_folder = Path(workdir) / "airdna" / "sources" / "listings"
+        listings_folder.mkdir(parents=True, exist_ok=True)
+        writer = PageWriter(listings_folder)
+        writer.start()
+        outcomes = Path(workdir) / "airdna" / "sources" / "scrape_log" / f"{localidad}_direct.jsonl"
+        controller = PaginationController(fetch, lambda offset, body: writer.put(localidad, offset, body),
+                                          limit=sys.maxsize, outcomes_path=outcomes)
+        await controller.run()
+        await writer.close()
+
+    asyncio.run(main())
+
+
+def summarize(workdir, localidad, expected, elapsed):
+    """Scenario results from the saved pages and the outcomes log"""
+    listings_folder = Path(workdir) / "airdna" / "sources" / "listings"
+    ids = set()
+    for path in listings_folder.glob(f"{localidad}_*.json"):
+        with open(path, 'r', encoding='utf-8') as f:
+            ids.update(listing['property_id'] for listing in json.load(f)['payload']['listings'])
+
+    records = []
+    for log in (Path(workdir) / "airdna" / "sources" / "scrape_log").glob("*.jsonl"):
+        with open(log, 'r', encoding='utf-8') as f:
+            records.extend(json.loads(line) for line in f)
+    outcomes = [r['outcome'] for r in records]
+    last = records[-1] if records else {}
+    return {
+        'seconds': elapsed,
+        'listings': len(ids),
+        'expected': expected,
+        'listings_per_s': len(ids) / elapsed if elapsed else 0,
+        'requests': len(records),
+        'retries': outcomes.count('retry'),
+        'failed': outcomes.count('failed'),
+        'final_page_size': last.get('next_page_size'),
+        'final_concurrency': last.get('concurrency'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the listings scraper against the local stand-in")
+    parser.add_argument("localidad", nargs="?", default="142652")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios")
+    parser.add_argument("--direct", action="store_true", help="Skip the browser, drive the paging code over HTTP")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for injected faults")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds before a scraper run is killed")
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {unknown}. Available: {list(SCENARIOS)}")
+
+    results = {}
+    for name in scenarios:
+        faults = Faults(**{**SCENARIOS[name].__dict__, 'seed': args.seed})
+        server = start_server(faults)
+        expected = len(server.listings.get(args.localidad, []))
+        try:
+            with tempfile.TemporaryDirectory(prefix=f"load_{name}_") as workdir:
+                start = time.perf_counter()
+                if args.direct:
+                    run_direct(server, args.localidad, workdir)
+                else:
+                    run_scraper(server, args.localidad, workdir, args.timeout)
+                results[name] = {**summarize(workdir, args.localidad, expected, time.perf_counter() - start),
+                                 'server': dict(server.stats)}
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        r = results[name]
+        print(f"{name:<15} {r['listings']}/{r['expected']} listings in {r['seconds']:.1f}s "
+              f"({r['listings_per_s']:.0f}/s), {r['requests']} requests, {r['retries']} retries, "
+              f"{r['failed']} failed, final page size {r['final_page_size']}, "
+              f"{r['final_concurrency']} in flight")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'localidad': args.localidad, 'direct': args.direct, 'results': results}, f, indent=2)
+
+    if any(r['listings'] < r['expected'] for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Persist scraped listing pages without blocking the Playwright event loop.
+
+The scraper hands each response body to PageWriter.put() and goes straight
+back to the network. A bounded asyncio queue feeds writer tasks that write
+every page in a thread pool. When the disk falls behind, put() waits, which
+keeps memory bounded.
+
+Bodies arrive already validated: PaginationController decodes each page once,
+off the event loop, to count its listings, so the writer does not decode again.
+
+Pages are written to a temporary file in the same folder and renamed into
+place, so a crash never leaves a half-written '{localidad}_{offset}.json'.
+"""
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import msgspec
+
+MAX_PENDING_PAGES = 8
+WRITER_WORKERS = 2
+
+
+def write_atomic(path, data):
+    """Write bytes to path through a temporary file and a rename"""
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.stem}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def save_page(responses_folder, localidad, offset, body):
+    """
+    Save a listings response as '{localidad}_{offset}.json'.
+
+    The body is written re-indented as it came, without going through Python objects.
+
+    Returns:
+        Path: The saved file
+    """
+    filename = Path(responses_folder) / f"{localidad}_{offset}.json"
+    write_atomic(filename, msgspec.json.format(body, indent=2))
+    return filename
+
+
+class PageWriter:
+    """
+    Bounded queue of pages to save, drained by writer tasks running save_page in threads.
+
+    Usage:
+        writer = PageWriter(responses_folder)
+        writer.start()
+        await writer.put(localidad, offset, body)
+        ...
+        await writer.close()
+    """
+
+    def __init__(self, responses_folder, max_pending=MAX_PENDING_PAGES, workers=WRITER_WORKERS):
+        self.responses_folder = responses_folder
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page-writer")
+        self.tasks = []
+        self.saved = []
+        self.failed = []
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self._drain()) for _ in range(self.workers)]
+
+    async def put(self, localidad, offset, body):
+        """Queue a page; waits while max_pending pages are already waiting to be written"""
+        await self.queue.put((localidad, offset, body))
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.queue.get()
+            try:
+                if item is None:
+                    return
+                localidad, offset, body = item
+                try:
+                    filename = await loop.run_in_executor(
+                        self.executor, save_page, self.responses_folder, localidad, offset, body)
+                    self.saved.append(filename)
+                    print(f"Response saved to {filename}")
+                except (msgspec.DecodeError, OSError) as e:
+                    self.failed.append((localidad, offset, str(e)))
+                    print(f"Error saving page {localidad}_{offset}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def close(self):
+        """Wait for every queued page to be written, then stop the writer tasks"""
+        for _ in self.tasks:
+            await self.queue.put(None)
+        await asyncio.gather(*self.tasks)
+        self.executor.shutdown()
+        print(f"Pages saved: {len(self.saved)}, failed: {len(self.failed)}")
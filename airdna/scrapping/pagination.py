@@ -0,0 +1,268 @@
+"""
+Adaptive pagination for the listings endpoint.
+
+PaginationController walks a section offset by offset through a fetch(offset,
+page_size) coroutine. Page size and the number of requests in flight are tuned
+AIMD-style: they grow while responses are fast and successful. Page size is
+halved when responses get slower than the target latency. Concurrency is halved
+on errors, timeouts and rate limits. Failed offsets are retried with jittered
+exponential backoff. A 429 or 503 also pauses new requests for the
+Retry-After time (or the backoff delay), since it applies to the whole server.
+Every attempt is appended to a JSONL log.
+
+The responses carry no total count, so a page with no listings marks the end of
+the section. A page with fewer listings than requested makes the controller
+fetch the missing part again, which either continues the section (the server
+capped the page size) or comes back empty (the section ended).
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+# payloads.py lives in airdna/, one level up from this script
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from payloads import DecodeError, decode_listings
+
+MIN_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+PAGE_SIZE_STEP = 25
+MAX_CONCURRENCY = 6
+# Responses slower than this shrink the page size
+TARGET_LATENCY = 8.0
+REQUEST_TIMEOUT = 60.0
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+@dataclass
+class PageJob:
+    offset: int
+    page_size: int
+    attempt: int = 0
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Full-jitter exponential backoff: uniform between 0 and min(cap, base * 2^attempt)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after_seconds(headers):
+    """Seconds from a Retry-After header (numeric form only), or None"""
+    value = (headers or {}).get('retry-after')
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class PaginationController:
+    """
+    Fetch a section from start_offset until limit listings or the end of the section.
+
+    Args:
+        fetch: async fetch(offset, page_size) -> (status, body bytes, headers dict)
+        on_page: async on_page(offset, body) called for every page with listings
+        start_offset: First offset to request
+        limit: Maximum number of listings to fetch
+        page_size: Initial page size
+        concurrency: Initial number of requests in flight
+        outcomes_path: JSONL file that gets one line per attempt
+    """
+
+    def __init__(self, fetch, on_page, start_offset=0, limit=100, page_size=100, concurrency=1,
+                 min_page_size=MIN_PAGE_SIZE, max_page_size=MAX_PAGE_SIZE, max_concurrency=MAX_CONCURRENCY,
+                 target_latency=TARGET_LATENCY, request_timeout=REQUEST_TIMEOUT, max_retries=MAX_RETRIES,
+                 outcomes_path=None):
+        self.fetch = fetch
+        self.on_page = on_page
+        self.end_limit = start_offset + limit
+        self.next_offset = start_offset
+        self.end_offset = None
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.min_page_size = min_page_size
+        self.max_page_size = max_page_size
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.outcomes_path = outcomes_path
+
+        self._retries = []  # heap of (ready_at, seq, PageJob)
+        self._paused_until = 0.0
+        self._seq = itertools.count()
+        self._successes = 0
+        self.fetched = 0
+        self.failed_offsets = []
+
+    # ---------- scheduling ----------
+
+    def _past_end(self, offset):
+        return offset >= self.end_limit or (self.end_offset is not None and offset >= self.end_offset)
+
+    def _schedule_retry(self, job, delay):
+        heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), job))
+
+    def _next_job(self):
+        """A retry that is due, else the next new offset, else None"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return None
+        while self._retries and self._retries[0][0] <= now:
+            job = heapq.heappop(self._retries)[2]
+            if not self._past_end(job.offset):
+                return job
+        if self._past_end(self.next_offset):
+            return None
+        size = min(self.page_size, self.end_limit - self.next_offset)
+        job = PageJob(self.next_offset, size)
+        self.next_offset += size
+        return job
+
+    def _seconds_to_next_job(self):
+        """Seconds until a retry is due or the pause ends, None if there is nothing left to wait for"""
+        while self._retries and self._past_end(self._retries[0][2].offset):
+            heapq.heappop(self._retries)
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if not self._retries:
+            return None
+        return max(0.0, self._retries[0][0] - now)
+
+    # ---------- AIMD ----------
+
+    def _on_success(self, latency):
+        if latency > self.target_latency:
+            self.page_size = max(self.min_page_size, self.page_size // 2)
+            self._successes = 0
+            return
+        self._successes += 1
+        # One additive step per "round" of concurrency successful responses
+        if self._successes >= self.concurrency:
+            self._successes = 0
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.page_size = min(self.max_page_size, self.page_size + PAGE_SIZE_STEP)
+
+    def _on_failure(self):
+        self._successes = 0
+        self.concurrency = max(1, self.concurrency // 2)
+
+    # ---------- attempts ----------
+
+    def _record(self, log, job, outcome, **fields):
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            'offset': job.offset,
+            'page_size': job.page_size,
+            'attempt': job.attempt,
+            'outcome': outcome,
+            'concurrency': self.concurrency,
+            'next_page_size': self.page_size,
+            **fields,
+        }
+        if log:
+            log.write(json.dumps(record) + "\n")
+            log.flush()
+        return record
+
+    async def _attempt(self, job, log):
+        start = time.monotonic()
+        status, body, headers, error = None, b"", {}, None
+        try:
+            status, body, headers = await asyncio.wait_for(self.fetch(job.offset, job.page_size),
+                                                           timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latency = time.monotonic() - start
+
+        count = None
+        if error is None and status == 200:
+            try:
+                # Decoded once, in a thread: the writer saves the body as it is
+                count = len((await asyncio.to_thread(decode_listings, body)).listings)
+            except DecodeError as e:
+                error = f"DecodeError: {e}"
+        elif error is None:
+            error = f"HTTP {status}"
+
+        if count is None:
+            self._on_failure()
+            if job.attempt >= self.max_retries:
+                self.failed_offsets.append(job.offset)
+                print(f"  ✗ offset {job.offset}: giving up after {job.attempt + 1} attempts ({error})")
+                return self._record(log, job, 'failed', status=status, latency_s=latency, error=error)
+            delay = retry_after_seconds(headers) if status in (429, 503) else None
+            delay = delay if delay is not None else backoff_delay(job.attempt)
+            if status in (429, 503):
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._schedule_retry(PageJob(job.offset, job.page_size, job.attempt + 1), delay)
+            print(f"  ↻ offset {job.offset}: {error}, retrying in {delay:.1f}s")
+            return self._record(log, job, 'retry', status=status, latency_s=latency, error=error,
+                                retry_in_s=delay)
+
+        self._on_success(latency)
+        if count == 0:
+            self.end_offset = job.offset if self.end_offset is None else min(self.end_offset, job.offset)
+            return self._record(log, job, 'empty', status=status, latency_s=latency, listings=0)
+
+        await self.on_page(job.offset, body)
+        self.fetched += count
+        if count < job.page_size:
+            # Either the server capped the page size or this is the last page; find out which
+            self._schedule_retry(PageJob(job.offset + count, job.page_size - count), 0)
+        print(f"  ✓ offset {job.offset}: {count} listings in {latency:.1f}s "
+              f"(page size {self.page_size}, {self.concurrency} in flight)")
+        return self._record(log, job, 'saved', status=status, latency_s=latency, listings=count)
+
+    async def run(self):
+        """
+        Fetch every page up to the limit or the end of the section.
+
+        Returns:
+            dict: listings fetched, end offset if reached, offsets that failed every retry
+        """
+        log = None
+        if self.outcomes_path:
+            Path(self.outcomes_path).parent.mkdir(parents=True, exist_ok=True)
+            log = open(self.outcomes_path, 'a', encoding='utf-8')
+        try:
+            in_flight = set()
+            while True:
+                while len(in_flight) < self.concurrency:
+                    job = self._next_job()
+                    if job is None:
+                        break
+                    in_flight.add(asyncio.create_task(self._attempt(job, log)))
+
+                # With every slot taken nothing can start before a request finishes; waiting only
+                # until an overdue retry would return immediately and spin
+                wait = self._seconds_to_next_job() if len(in_flight) < self.concurrency else None
+                if not in_flight:
+                    if wait is None:
+                        break
+                    await asyncio.sleep(wait)
+                    continue
+                done, in_flight = await asyncio.wait(in_flight, timeout=wait,
+                                                     return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        finally:
+            if log:
+                log.close()
+
+        return {
+            'fetched': self.fetched,
+            'end_offset': self.end_offset,
+            'failed_offsets': sorted(self.failed_offsets),
+        }
@@ -0,0 +1,329 @@
+"""
+Local stand-in for app.airdna.co / api.airdna.co, for testing the scraper offline.
+
+Serves just enough of the site for get_listings_per_section.py:
+- '/' with a "Log in" link, '/login' with the Email/Password form (any credentials work)
+- '/data/co/12/{id}/top-listings', a page that sends the first listings POST like the real app
+- POST '/api/explorer/v2/submarket/{id}/listings', answered from the recorded
+  'sources/listings/{id}_{offset}.json' pages, honouring pagination.offset/page_size
+- every other recorded POST in the HAR captures (overview/bedrooms, ...), replayed as captured
+
+API requests without the session cookie get a 401. Latency, errors, rate limits and
+a server-side page size cap can be injected to exercise the scraper's retries and tuning.
+
+Usage:
+    python airdna/scrapping/stand_in.py [--port 8765] [--latency 0.2] [--error-rate 0.05] [--rate-limit 5]
+    AIRDNA_APP_URL=http://127.0.0.1:8765 AIRDNA_HEADLESS=1 python airdna/scrapping/get_listings_per_section.py 142652 0
+"""
+import argparse
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+AIRDNA_DIR = Path(__file__).resolve().parents[1]
+LISTINGS_DIR = AIRDNA_DIR / "sources" / "listings"
+HAR_DIR = AIRDNA_DIR / "sources" / "har"
+
+SESSION_COOKIE = "stand_in_session"
+LISTINGS_PATH = re.compile(r"^/api/explorer/v2/submarket/(\d+)/listings$")
+TOP_LISTINGS_PATH = re.compile(r"^/data/co/\d+/(\d+)/top-listings$")
+PAGE_FILE = re.compile(r"^(\d+)_(\d+)\.json$")
+
+SUCCESS_STATUS = {'code': 'EXPLORER-S-000', 'message': 'Success', 'human': 'Success', 'type': 'success'}
+
+
+@dataclass
+class Faults:
+    """What the stand-in does to API requests"""
+    latency: float = 0.0              # seconds added to every API response
+    latency_per_listing: float = 0.0  # seconds per listing returned, so big pages are slower
+    jitter: float = 0.0               # +/- fraction of the latency
+    error_rate: float = 0.0           # share of API requests answered with a 500
+    truncate_rate: float = 0.0        # share answered 200 with a cut-off JSON body
+    rate_limit: float = 0.0           # API requests per second before answering 429 (0 = no limit)
+    capacity: int = 0                 # requests in flight before answering 503 (0 = no limit)
+    max_page_size: int = 0            # page_size cap applied by the server (0 = no cap)
+    seed: int = None
+
+
+def load_recorded_listings(listings_dir=LISTINGS_DIR):
+    """All recorded listings per localidad, in offset order, without repeated property ids"""
+    pages = {}
+    for path in Path(listings_dir).glob("*_*.json"):
+        match = PAGE_FILE.match(path.name)
+        if match:
+            pages.setdefault(match.group(1), []).append((int(match.group(2)), path))
+
+    listings = {}
+    for localidad, files in pages.items():
+        seen, rows = set(), []
+        for _, path in sorted(files):
+            with open(path, 'r', encoding='utf-8') as f:
+                for listing in json.load(f)['payload']['listings']:
+                    if listing['property_id'] not in seen:
+                        seen.add(listing['property_id'])
+                        rows.append(listing)
+        listings[localidad] = rows
+    return listings
+
+
+def load_recorded_posts(har_dir=HAR_DIR):
+    """JSON responses of the POST requests in the HAR captures, by URL path"""
+    responses = {}
+    for har_file in sorted(Path(har_dir).glob("*.har")):
+        with open(har_file, 'r', encoding='utf-8') as f:
+            entries = json.load(f).get('log', {}).get('entries', [])
+        for entry in entries:
+            request, content = entry['request'], entry['response'].get('content', {})
+            if request['method'] == 'POST' and 'json' in content.get('mimeType', '') and content.get('text'):
+                responses[urlsplit(request['url']).path] = content['text'].encode('utf-8')
+    return responses
+
+
+LANDING_PAGE = """<!doctype html><html><body>
+<h1>AirDNA stand-in</h1><a href="/login">Log in</a>
+</body></html>"""
+
+LOGIN_PAGE = """<!doctype html><html><body>
+<form method="post" action="/login">
+  <input name="email" placeholder="Email"><input name="password" type="password" placeholder="Password">
+  <button type="submit">Log in</button>
+</form>
+</body></html>"""
+
+TOP_LISTINGS_PAGE = """<!doctype html><html><body>
+<h1>Top listings {localidad}</h1><pre id="status">loading</pre>
+<script>
+fetch("/api/explorer/v2/submarket/{localidad}/listings", {{
+  method: "POST",
+  headers: {{"Content-Type": "application/json", "Accept": "application/json"}},
+  body: JSON.stringify({{filters: [], sort_order: "revenue", pagination: {{offset: 0, page_size: 25}}}}),
+}}).then(r => document.getElementById("status").textContent = r.status);
+</script>
+</body></html>"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server_version = "AirDNAStandIn/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # ---------- helpers ----------
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_html(self, html):
+        self._send(200, html.encode('utf-8'), "text/html; charset=utf-8")
+
+    def _logged_in(self):
+        cookies = self.headers.get("Cookie", "")
+        return any(c.strip() == f"{SESSION_COOKIE}={token}" for c in cookies.split(";")
+                   for token in self.server.sessions)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _read_json(self):
+        try:
+            return json.loads(self._read_body() or b"{}")
+        except ValueError:
+            return None
+
+    # ---------- routes ----------
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/":
+            self._send_html(LANDING_PAGE)
+        elif path == "/login":
+            self._send_html(LOGIN_PAGE)
+        elif TOP_LISTINGS_PATH.match(path):
+            if not self._logged_in():
+                self._send(303, headers={"Location": "/login"})
+                return
+            self._send_html(TOP_LISTINGS_PAGE.format(localidad=TOP_LISTINGS_PATH.match(path).group(1)))
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path == "/login":
+            self._read_body()  # form body, any credentials are accepted
+            token = secrets.token_hex(16)
+            self.server.sessions.add(token)
+            self._send(303, headers={"Location": "/", "Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/"})
+            return
+        if not self._logged_in():
+            self._send(401, b'{"error": "not logged in"}')
+            return
+        self.server.api_request(self, path)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, faults=None, listings_dir=LISTINGS_DIR, har_dir=HAR_DIR, verbose=False):
+        super().__init__(address, StandInHandler)
+        self.faults = faults or Faults()
+        self.verbose = verbose
+        self.listings = load_recorded_listings(listings_dir)
+        self.recorded_posts = load_recorded_posts(har_dir)
+        self.sessions = set()
+        self.random = random.Random(self.faults.seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.request_times = []
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'truncated': 0, 'rate_limited': 0, 'overloaded': 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self):
+        """Status code to reject the request with, or None to serve it"""
+        faults = self.faults
+        with self.lock:
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            if faults.rate_limit:
+                self.request_times = [t for t in self.request_times if now - t < 1.0]
+                if len(self.request_times) >= faults.rate_limit:
+                    self.stats['rate_limited'] += 1
+                    return 429
+                self.request_times.append(now)
+            if faults.capacity and self.in_flight >= faults.capacity:
+                self.stats['overloaded'] += 1
+                return 503
+            self.in_flight += 1
+            return None
+
+    def _delay(self, listings):
+        faults = self.faults
+        delay = faults.latency + faults.latency_per_listing * listings
+        if faults.jitter:
+            with self.lock:
+                delay *= 1 + self.random.uniform(-faults.jitter, faults.jitter)
+        time.sleep(max(0.0, delay))
+
+    def _listings_body(self, localidad, request_body):
+        pagination = (request_body or {}).get('pagination') or {}
+        offset = max(0, int(pagination.get('offset', 0)))
+        page_size = max(0, int(pagination.get('page_size', 25)))
+        if self.faults.max_page_size:
+            page_size = min(page_size, self.faults.max_page_size)
+        listings = self.listings.get(localidad, [])[offset:offset + page_size]
+        body = {
+            'payload': {
+                'sort_order': (request_body or {}).get('sort_order', 'revenue'),
+                'listings': listings,
+                'pagination': {'page_size': page_size, 'offset': offset},
+            },
+            'status': SUCCESS_STATUS,
+        }
+        return json.dumps(body).encode('utf-8'), len(listings)
+
+    def api_request(self, handler, path):
+        request_body = handler._read_json()
+        rejected = self._admit()
+        if rejected == 429:
+            handler._send(429, b'{"error": "rate limited"}', headers={"Retry-After": "1"})
+            return
+        if rejected == 503:
+            handler._send(503, b'{"error": "overloaded"}')
+            return
+        try:
+            match = LISTINGS_PATH.match(path)
+            if match:
+                body, count = self._listings_body(match.group(1), request_body)
+            elif path in self.recorded_posts:
+                body, count = self.recorded_posts[path], 0
+            else:
+                handler._send(404, b'{"error": "not recorded"}')
+                return
+            self._delay(count)
+
+            with self.lock:
+                roll = self.random.random()
+            if roll < self.faults.error_rate:
+                with self.lock:
+                    self.stats['errors'] += 1
+                handler._send(500, b'{"error": "injected"}')
+            elif roll < self.faults.error_rate + self.faults.truncate_rate:
+                with self.lock:
+                    self.stats['truncated'] += 1
+                handler._send(200, body[:len(body) // 2])
+            else:
+                with self.lock:
+                    self.stats['ok'] += 1
+                handler._send(200, body)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def start_server(faults=None, host="127.0.0.1", port=0, **kwargs):
+    """Start a stand-in in a background thread (port 0 picks a free one); call .shutdown() to stop it"""
+    server = StandInServer((host, port), faults, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_fault_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every API response")
+    parser.add_argument("--latency-per-listing", type=float, default=0.0, help="Seconds per listing returned")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- fraction of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of API requests answered with a 500")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="Share answered with cut-off JSON")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="API requests per second before a 429")
+    parser.add_argument("--capacity", type=int, default=0, help="Requests in flight before a 503")
+    parser.add_argument("--max-page-size", type=int, default=0, help="Server-side page_size cap")
+    parser.add_argument("--seed", type=int, help="Seed for injected faults")
+
+
+def faults_from_args(args):
+    return Faults(latency=args.latency, latency_per_listing=args.latency_per_listing, jitter=args.jitter,
+                  error_rate=args.error_rate, truncate_rate=args.truncate_rate, rate_limit=args.rate_limit,
+                  capacity=args.capacity, max_page_size=args.max_page_size, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the AirDNA listings API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = StandInServer((args.host, args.port), faults_from_args(args), verbose=args.verbose)
+    counts = {localidad: len(rows) for localidad, rows in server.listings.items()}
+    print(f"Serving {sum(counts.values())} recorded listings for {len(counts)} localidades "
+          f"and {len(server.recorded_posts)} HAR responses at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Stats: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Inverted index over listing titles.
+
+Titles are the only way to find a specific property or building ("ATTIK",
+"Zona T", "Virrey"). The index maps every accent-folded title token to the
+listings whose title contains it, across the current 'cleaned/listings/*.csv'
+and every snapshot in 'history/listings/'. It is saved as
+'cleaned/title_index.json' and rebuilt by ingest and the pipeline.
+
+Every query token matches as a prefix ("virr" finds "Virrey") and a listing
+must match all of them. Tokens are kept sorted, so a prefix is a bisect plus
+a union of posting lists, and queries take milliseconds.
+
+Usage:
+    python airdna/search.py build
+    python airdna/search.py <query words>
+"""
+import bisect
+import json
+import re
+import sys
+import time
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+
+import msgspec
+
+AIRDNA_DIR = Path(__file__).resolve().parent
+CLEANED_DIR = AIRDNA_DIR / "cleaned"
+HISTORY_DIR = AIRDNA_DIR / "history"
+INDEX_PATH = CLEANED_DIR / "title_index.json"
+INDEX_VERSION = 1
+
+DOC_COLUMNS = ['property_id', 'title', 'section', 'listing_type', 'bedrooms', 'lat', 'lng']
+COMPARABLE_COLUMNS = [
+    'property_id', 'title', 'listing_type', 'bedrooms', 'bathrooms', 'accommodates', 'rating', 'reviews',
+    'revenue_ltm', 'occupancy_rate_ltm', 'average_daily_rate_ltm', 'lat', 'lng',
+]
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def fold(text):
+    """Lowercase text without accents: 'Bogotá Ñandú' -> 'bogota nandu'"""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    return _TOKEN.findall(fold(text))
+
+
+# ---------- building ----------
+
+def _snapshot_titles(history_dir):
+    """(snapshot date, property_id, title) for every listing in every snapshot"""
+    import pyarrow.parquet as pq
+
+    listings_dir = Path(history_dir) / "listings"
+    if not listings_dir.exists():
+        return
+    for snapshot_dir in sorted(p for p in listings_dir.iterdir() if p.is_dir() and not p.name.startswith('.')):
+        for path in sorted(snapshot_dir.glob("*.parquet")):
+            table = pq.read_table(path, columns=['property_id', 'title'])
+            for property_id, title in zip(table['property_id'].to_pylist(), table['title'].to_pylist()):
+                yield snapshot_dir.name, property_id, title
+
+
+def build_title_index(cleaned_dir=CLEANED_DIR, history_dir=HISTORY_DIR, path=None):
+    """
+    Build and save the title index from the cleaned CSVs and every snapshot.
+
+    Listings only found in snapshots keep their last known title and no location.
+
+    Returns:
+        dict: The saved index ('docs' columns and 'tokens' -> sorted doc numbers)
+    """
+    import pyarrow.csv as pa_csv
+
+    start = time.perf_counter()
+    path = Path(path) if path else Path(cleaned_dir) / INDEX_PATH.name
+    docs = {column: [] for column in DOC_COLUMNS}
+    docs['snapshots'] = []
+    titles = []  # every title seen per doc
+    numbers = {}
+
+    def doc_number(property_id):
+        number = numbers.get(property_id)
+        if number is None:
+            number = numbers[property_id] = len(titles)
+            for column in docs:
+                docs[column].append([] if column == 'snapshots' else None)
+            docs['property_id'][number] = property_id
+            titles.append(set())
+        return number
+
+    for snapshot_date, property_id, title in _snapshot_titles(history_dir):
+        number = doc_number(property_id)
+        docs['snapshots'][number].append(snapshot_date)
+        if title:
+            docs['title'][number] = title
+            titles[number].add(title)
+
+    options = pa_csv.ConvertOptions(include_columns=DOC_COLUMNS, include_missing_columns=True,
+                                    column_types={'property_id': 'string', 'section': 'string', 'title': 'string'})
+    for csv_path in sorted((Path(cleaned_dir) / "listings").glob("*.csv")):
+        table = pa_csv.read_csv(csv_path, convert_options=options)
+        for row in table.to_pylist():
+            number = doc_number(row['property_id'])
+            for column in DOC_COLUMNS[1:]:
+                if row[column] is not None:
+                    docs[column][number] = row[column]
+            if row['title']:
+                titles[number].add(row['title'])
+
+    postings = {}
+    for number, doc_titles in enumerate(titles):
+        for token in {token for title in doc_titles for token in tokenize(title)}:
+            postings.setdefault(token, []).append(number)
+
+    index = {
+        'version': INDEX_VERSION,
+        'built_at': datetime.now().isoformat(),
+        'docs': docs,
+        'tokens': dict(sorted(postings.items())),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    tmp.replace(path)
+    print(f"Title index: {len(titles)} listings, {len(postings)} tokens "
+          f"in {time.perf_counter() - start:.2f}s -> {path}")
+    return index
+
+
+# ---------- querying ----------
+
+class TitleIndex:
+    """A loaded title index; search() returns matching listings as dicts"""
+
+    def __init__(self, index):
+        self.docs = index['docs']
+        self.postings = index['tokens']
+        self.vocabulary = sorted(self.postings)
+        self.built_at = index.get('built_at')
+
+    def __len__(self):
+        return len(self.docs['property_id'])
+
+    def prefix_matches(self, prefix):
+        """Doc numbers whose title has a token starting with prefix, and those where it is a whole token"""
+        first = bisect.bisect_left(self.vocabulary, prefix)
+        last = bisect.bisect_left(self.vocabulary, prefix + "\uffff")
+        matches = set()
+        for token in self.vocabulary[first:last]:
+            matches.update(self.postings[token])
+        return matches, set(self.postings.get(prefix, ()))
+
+    def search(self, query, limit=50):
+        """
+        Listings whose titles contain every query word as a prefix.
+
+        Listings with more whole-word matches come first, then those seen in more snapshots.
+
+        Returns:
+            list: Dicts with property_id, title, section, listing_type, bedrooms, lat, lng and snapshots
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        matches, exact_hits = None, {}
+        for token in tokens:
+            found, exact = self.prefix_matches(token)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+            for number in exact:
+                exact_hits[number] = exact_hits.get(number, 0) + 1
+        ranked = sorted(matches, key=lambda n: (-exact_hits.get(n, 0), -len(self.docs['snapshots'][n]),
+                                                self.docs['title'][n] or ""))
+        return [self.doc(number) for number in ranked[:limit]]
+
+    def doc(self, number):
+        return {column: values[number] for column, values in self.docs.items()}
+
+
+def load_title_index(path=INDEX_PATH, build_if_missing=True):
+    """
+    Load the saved title index, building it first if it does not exist yet.
+
+    Returns:
+        TitleIndex: or None when the index is missing and build_if_missing is False
+    """
+    path = Path(path)
+    if path.exists():
+        with open(path, 'rb') as f:
+            index = msgspec.json.decode(f.read())
+        if index.get('version') == INDEX_VERSION:
+            return TitleIndex(index)
+    if not build_if_missing:
+        return None
+    return TitleIndex(build_title_index(path=path))
+
+
+def comparables(listing, cleaned_dir=CLEANED_DIR, limit=20):
+    """
+    Listings in the same localidad with the same listing type and bedrooms, by revenue.
+
+    Args:
+        listing (dict): A search result (needs 'section', 'listing_type' and 'bedrooms')
+
+    Returns:
+        pandas.DataFrame: Comparable listings, the listing itself included
+    """
+    import pandas as pd
+
+    from schema import read_listings_csv
+
+    path = Path(cleaned_dir) / "listings" / f"{listing['section']}.csv"
+    if not listing.get('section') or not path.exists():
+        return None
+    df = read_listings_csv(path)
+    same = df['listing_type'] == listing['listing_type']
+    if listing.get('bedrooms') is not None:
+        same &= df['bedrooms'] == listing['bedrooms']
+    columns = [c for c in COMPARABLE_COLUMNS if c in df.columns]
+    ranked = df.loc[same, columns].sort_values('revenue_ltm', ascending=False)
+    top = ranked.head(limit)
+    if not (top['property_id'] == listing['property_id']).any():
+        # Keep the listing itself in the table even when it ranks below the limit
+        top = pd.concat([top, df.loc[df['property_id'] == listing['property_id'], columns]])
+    return top.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_title_index()
+    elif len(sys.argv) > 1:
+        title_index = load_title_index()
+        query = " ".join(sys.argv[1:])
+        start = time.perf_counter()
+        results = title_index.search(query)
+        elapsed = time.perf_counter() - start
+        for result in results:
+            print(f"{result['property_id']:<28} {result['section'] or '-':<7} {result['title']}")
+        print(f"{len(results)} results for '{query}' in {elapsed * 1000:.2f} ms ({len(title_index)} listings indexed)")
+    else:
+        print("Usage: python airdna/search.py [build | <query words>]")
@@ -0,0 +1,271 @@
+"""
+Snapshot history for AirDNA listings.
+
+Every scrape overwrites 'sources/listings/{localidad}_{offset}.json', so this
+module freezes each ingest into an immutable, dated partition under
+'history/listings/{snapshot_date}/{localidad}.parquet' and diffs consecutive
+snapshots by 'property_id'.
+
+Diffing works one localidad at a time and first reads only the key columns
+('property_id', 'row_hash', 'revenue_ltm'); full rows are read only for the
+listings that appeared, disappeared or changed, so memory stays bounded by the
+largest localidad regardless of how many snapshots are stored.
+
+Usage:
+    python airdna/snapshots.py ingest [snapshot_date]
+    python airdna/snapshots.py diff [previous_date] [current_date]
+    python airdna/snapshots.py churn
+    python airdna/snapshots.py list
+"""
+import json
+import shutil
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from ingest import LISTINGS_DIR, group_page_files, read_listing_tables, to_listings_frame
+
+AIRDNA_DIR = Path(__file__).resolve().parent
+HISTORY_DIR = AIRDNA_DIR / "history"
+
+KEY_COLUMNS = ["property_id", "row_hash", "revenue_ltm"]
+
+# Columns whose values define a "changed" listing between two snapshots
+TRACKED_COLUMNS = [
+    "listing_type", "bedrooms", "bathrooms", "accommodates", "rating", "reviews",
+    "title", "revenue_ltm", "revenue_potential_ltm", "occupancy_rate_ltm",
+    "average_daily_rate_ltm", "days_available_ltm", "lat", "lng",
+]
+
+
+def _normalize(df, columns):
+    """Cast tracked columns to text, numbers through float64, so dtype drift between runs is not a change"""
+    return pd.DataFrame({
+        col: (df[col].astype('float64') if pd.api.types.is_numeric_dtype(df[col]) else df[col]).astype("string")
+        for col in columns
+    })
+
+
+def hash_rows(df):
+    """Hash the tracked columns of each row so changes can be detected without comparing values"""
+    columns = [c for c in TRACKED_COLUMNS if c in df.columns]
+    return pd.util.hash_pandas_object(_normalize(df, columns), index=False).to_numpy()
+
+
+def list_snapshots(history_dir=HISTORY_DIR):
+    """Return the stored snapshot dates, oldest first"""
+    listings_dir = Path(history_dir) / "listings"
+    if not listings_dir.exists():
+        return []
+    return sorted(p.name for p in listings_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+
+def ingest_snapshot(snapshot_date=None, listings_dir=LISTINGS_DIR, history_dir=HISTORY_DIR):
+    """
+    Store the current contents of the listings folder as a new immutable snapshot.
+
+    Args:
+        snapshot_date (str): ISO date for the snapshot. Defaults to today.
+        listings_dir (Path): Folder with the raw '{localidad}_{offset}.json' pages
+        history_dir (Path): Root of the snapshot store
+
+    Returns:
+        dict: Manifest of the written snapshot
+    """
+    snapshot_date = snapshot_date or date.today().isoformat()
+    date.fromisoformat(snapshot_date)
+
+    snapshot_dir = Path(history_dir) / "listings" / snapshot_date
+    if snapshot_dir.exists():
+        raise FileExistsError(f"Snapshot {snapshot_date} already exists; snapshots are immutable")
+
+    # Write into a hidden folder and rename at the end so a failed ingest never leaves a partial snapshot
+    tmp_dir = snapshot_dir.with_name(f".{snapshot_date}.tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    manifest = {'snapshot_date': snapshot_date, 'created_at': datetime.now().isoformat(), 'localidades': {}}
+    try:
+        pages = group_page_files(listings_dir)
+        for localidad, table in read_listing_tables(listings_dir=listings_dir).items():
+            # Full-precision metrics: the snapshot is a file, not a working frame
+            df = to_listings_frame(table, compact_floats=False).drop_duplicates(subset='property_id', keep='first')
+            files = pages[localidad]
+            df['row_hash'] = hash_rows(df)
+            df.to_parquet(tmp_dir / f"{localidad}.parquet", index=False)
+            manifest['localidades'][localidad] = {'pages': len(files), 'listings': len(df)}
+            print(f"  {localidad}: {len(df)} listings from {len(files)} pages")
+
+        with open(tmp_dir / "_manifest.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        tmp_dir.rename(snapshot_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    total = sum(item['listings'] for item in manifest['localidades'].values())
+    print(f"Snapshot {snapshot_date} saved: {total} listings in {len(manifest['localidades'])} localidades")
+    return manifest
+
+
+def _read_section(snapshot_dir, section, columns=None):
+    path = snapshot_dir / f"{section}.parquet"
+    if not path.exists():
+        return None
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def _snapshot_sections(snapshot_dir):
+    return {p.stem for p in snapshot_dir.glob("*.parquet")}
+
+
+def diff_section(previous_dir, current_dir, section):
+    """
+    Diff a single localidad between two snapshots.
+
+    Returns:
+        tuple: (new_df, removed_df, changed_df, churn_row)
+    """
+    empty_keys = pd.DataFrame({c: pd.Series(dtype='object') for c in KEY_COLUMNS})
+    prev_keys = _read_section(previous_dir, section, KEY_COLUMNS)
+    curr_keys = _read_section(current_dir, section, KEY_COLUMNS)
+    prev_keys = empty_keys if prev_keys is None else prev_keys
+    curr_keys = empty_keys if curr_keys is None else curr_keys
+
+    joined = prev_keys.merge(curr_keys, on='property_id', how='outer',
+                             suffixes=('_prev', '_curr'), indicator=True)
+    new_ids = joined.loc[joined['_merge'] == 'right_only', 'property_id']
+    removed_ids = joined.loc[joined['_merge'] == 'left_only', 'property_id']
+    both = joined[joined['_merge'] == 'both']
+    changed_keys = both[both['row_hash_prev'] != both['row_hash_curr']]
+
+    new_df = removed_df = changed_df = None
+    if len(new_ids) or len(changed_keys):
+        current = _read_section(current_dir, section)
+        new_df = current[current['property_id'].isin(new_ids)]
+        changed_df = current[current['property_id'].isin(changed_keys['property_id'])]
+    if len(removed_ids) or len(changed_keys):
+        previous = _read_section(previous_dir, section)
+        removed_df = previous[previous['property_id'].isin(removed_ids)]
+        if len(changed_keys):
+            changed_df = _describe_changes(previous, changed_df)
+
+    churn = {
+        'section': section,
+        'listings_prev': len(prev_keys),
+        'listings_curr': len(curr_keys),
+        'new': len(new_ids),
+        'removed': len(removed_ids),
+        'changed': len(changed_keys),
+        'unchanged': len(both) - len(changed_keys),
+        'churn_rate': (len(new_ids) + len(removed_ids)) / len(prev_keys) if len(prev_keys) else None,
+        'revenue_ltm_prev': prev_keys['revenue_ltm'].sum(),
+        'revenue_ltm_curr': curr_keys['revenue_ltm'].sum(),
+    }
+    return new_df, removed_df, changed_df, churn
+
+
+def _describe_changes(previous, changed_df):
+    """Attach the previous revenue and the list of changed tracked columns to each changed row"""
+    columns = [c for c in TRACKED_COLUMNS if c in previous.columns and c in changed_df.columns]
+    prev = previous.set_index('property_id').loc[changed_df['property_id'], columns]
+    curr = changed_df.set_index('property_id')[columns]
+    prev_text, curr_text = _normalize(prev, columns), _normalize(curr, columns)
+    differs = (prev_text != curr_text) & ~(prev_text.isna() & curr_text.isna())
+    differs = differs.fillna(True)
+
+    changed_df = changed_df.copy()
+    changed_df['changed_columns'] = [
+        ",".join(col for col, flag in zip(columns, flags) if flag) for flags in differs.to_numpy()
+    ]
+    if 'revenue_ltm' in columns:
+        changed_df['revenue_ltm_prev'] = prev['revenue_ltm'].to_numpy()
+        changed_df['revenue_ltm_delta'] = changed_df['revenue_ltm'] - changed_df['revenue_ltm_prev']
+    return changed_df
+
+
+def diff_snapshots(previous_date=None, current_date=None, history_dir=HISTORY_DIR, save=True):
+    """
+    Diff two snapshots localidad by localidad.
+
+    Args:
+        previous_date (str): Older snapshot. Defaults to the second most recent one.
+        current_date (str): Newer snapshot. Defaults to the most recent one.
+        history_dir (Path): Root of the snapshot store
+        save (bool): Write results to 'history/diffs/{previous}__{current}/'
+
+    Returns:
+        dict: DataFrames under 'new', 'removed', 'changed' and 'churn'
+    """
+    snapshots = list_snapshots(history_dir)
+    if previous_date is None or current_date is None:
+        if len(snapshots) < 2:
+            raise ValueError("At least two snapshots are needed to compute a diff")
+        previous_date, current_date = snapshots[-2], snapshots[-1]
+
+    listings_dir = Path(history_dir) / "listings"
+    previous_dir, current_dir = listings_dir / previous_date, listings_dir / current_date
+    for snapshot_dir in (previous_dir, current_dir):
+        if not snapshot_dir.exists():
+            raise FileNotFoundError(f"Snapshot '{snapshot_dir.name}' not found in {listings_dir}")
+
+    parts = {'new': [], 'removed': [], 'changed': []}
+    churn_rows = []
+    for section in sorted(_snapshot_sections(previous_dir) | _snapshot_sections(current_dir)):
+        new_df, removed_df, changed_df, churn = diff_section(previous_dir, current_dir, section)
+        for name, frame in (('new', new_df), ('removed', removed_df), ('changed', changed_df)):
+            if frame is not None and len(frame):
+                parts[name].append(frame)
+        churn_rows.append(churn)
+
+    result = {name: pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+              for name, frames in parts.items()}
+    churn_df = pd.DataFrame(churn_rows)
+    churn_df.insert(0, 'previous_date', previous_date)
+    churn_df.insert(1, 'current_date', current_date)
+    result['churn'] = churn_df
+
+    print(f"Diff {previous_date} -> {current_date}: "
+          f"{len(result['new'])} new, {len(result['removed'])} removed, {len(result['changed'])} changed")
+
+    if save:
+        diff_dir = Path(history_dir) / "diffs" / f"{previous_date}__{current_date}"
+        diff_dir.mkdir(parents=True, exist_ok=True)
+        for name in ('new', 'removed', 'changed'):
+            result[name].to_parquet(diff_dir / f"{name}.parquet", index=False)
+        churn_df.to_csv(diff_dir / "churn.csv", index=False)
+        print(f"Saved to {diff_dir}")
+
+    return result
+
+
+def churn_history(history_dir=HISTORY_DIR):
+    """Per-localidad churn for every pair of consecutive snapshots, reusing saved diffs"""
+    snapshots = list_snapshots(history_dir)
+    frames = []
+    for previous_date, current_date in zip(snapshots, snapshots[1:]):
+        churn_file = Path(history_dir) / "diffs" / f"{previous_date}__{current_date}" / "churn.csv"
+        if churn_file.exists():
+            frames.append(pd.read_csv(churn_file, dtype={'section': str}))
+        else:
+            frames.append(diff_snapshots(previous_date, current_date, history_dir)['churn'])
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "ingest":
+        ingest_snapshot(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif command == "diff":
+        diff_snapshots(*sys.argv[2:4])
+    elif command == "churn":
+        print(churn_history().to_string(index=False))
+    elif command == "list":
+        for snapshot in list_snapshots():
+            print(snapshot)
+    else:
+        print("Usage: python airdna/snapshots.py [ingest [date] | diff [previous] [current] | churn | list]")
@@ -0,0 +1,131 @@
+"""
+Offline benchmark fixtures built from the checked-in data, optionally scaled up.
+
+At scale N every fixture is repeated N times with fresh ids, so the pipeline
+stages see N times the listings, HAR entries, localidades and polygons.
+"""
+import json
+import math
+import shutil
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+AIRDNA_DIR = REPO_DIR / "airdna"
+LISTINGS_DIR = AIRDNA_DIR / "sources" / "listings"
+SOURCES_DIR = AIRDNA_DIR / "sources"
+HAR_FILE = SOURCES_DIR / "har" / "airdna.har"
+HAR_RESULTS_DIR = REPO_DIR / "har_results"
+LOCALIDADES_CSV = AIRDNA_DIR / "cleaned" / "localidades.csv"
+MAPS_LOCALIDADES_CSV = REPO_DIR / "maps" / "localidades.csv"
+
+# Offsets of scaled copies of a page start here so they never collide with real offsets
+COPY_OFFSET = 1_000_000
+# Real localidad polygons have hundreds of vertices; synthetic ones match that order of magnitude
+POLYGON_VERTICES = 400
+
+
+def _page_sample(pages):
+    files = sorted(LISTINGS_DIR.glob("*_*.json"))
+    return files[:pages] if pages else files
+
+
+def build_listings(workdir, scale, pages=None):
+    """Copy listing pages scale times, suffixing property ids on each copy"""
+    out_dir = Path(workdir) / "listings"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for path in _page_sample(pages):
+        localidad, offset = path.stem.split('_')
+        shutil.copy(path, out_dir / path.name)
+        if scale == 1:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for copy in range(1, scale):
+            for listing in data['payload']['listings']:
+                listing['property_id'] = listing['property_id'].split('#')[0] + f"#{copy}"
+            with open(out_dir / f"{localidad}_{int(offset) + copy * COPY_OFFSET}.json", 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+    return out_dir
+
+
+def _scaled_id(localidad_id, copy):
+    return str(int(localidad_id) + copy * COPY_OFFSET) if copy else str(localidad_id)
+
+
+def build_details(workdir, scale):
+    """Copy every 'sources/<id>/' detail folder scale times under new ids"""
+    out_dir = Path(workdir) / "sources"
+    localidades = []
+    for source in sorted(p for p in SOURCES_DIR.iterdir() if p.is_dir() and p.name.isdigit()):
+        for copy in range(scale):
+            localidad = _scaled_id(source.name, copy)
+            shutil.copytree(source, out_dir / localidad)
+            localidades.append(localidad)
+    return out_dir, localidades
+
+
+def build_har(workdir, scale):
+    """HAR capture with its entries repeated scale times"""
+    with open(HAR_FILE, 'r', encoding='utf-8') as f:
+        har = json.load(f)
+    har['log']['entries'] = har['log']['entries'] * scale
+    out_file = Path(workdir) / "capture.har"
+    with open(out_file, 'w', encoding='utf-8') as f:
+        json.dump(har, f)
+    return out_file
+
+
+def build_map_values(scale):
+    """Revenue values of the 'har_results/map_listings_*.json' captures, repeated scale times"""
+    values = []
+    for path in sorted(HAR_RESULTS_DIR.glob("map_listings_*.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        values.extend(listing['metrics']['revenue'] for listing in data['payload']['listings'])
+    return values * scale
+
+
+def _ring(center_lng, center_lat, radius):
+    """Closed circular ring in esri [x, y] = [lng, lat] order"""
+    ring = [[center_lng + radius * math.cos(2 * math.pi * i / POLYGON_VERTICES),
+             center_lat + radius * math.sin(2 * math.pi * i / POLYGON_VERTICES)]
+            for i in range(POLYGON_VERTICES)]
+    return ring + [ring[0]]
+
+
+def build_polygon_layer(scale):
+    """
+    Esri polygon layer plus the matching localidades CSV rows.
+
+    There is no polygon file in the repo, so each localidad in 'maps/localidades.csv'
+    becomes a ring around the centroid of its listings.
+
+    Returns:
+        tuple: (esri_data dict, list of CSV row dicts)
+    """
+    import pandas as pd
+
+    localidades = pd.read_csv(MAPS_LOCALIDADES_CSV)
+    centroids = {}
+    for path in _page_sample(None):
+        section = path.stem.split('_')[0]
+        if section in centroids:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            listings = json.load(f)['payload']['listings']
+        lats = [l['location']['lat'] for l in listings]
+        lngs = [l['location']['lng'] for l in listings]
+        centroids[section] = (sum(lngs) / len(lngs), sum(lats) / len(lats))
+
+    features, rows = [], []
+    for copy in range(scale):
+        for _, row in localidades.iterrows():
+            lng, lat = centroids.get(str(row['id']), (-74.08, 4.65))
+            name = row['LocNombre'] if copy == 0 else f"{row['LocNombre']} {copy}"
+            features.append({
+                'attributes': {'LocNombre': name, 'LocCodigo': str(row['id'])},
+                'geometry': {'rings': [_ring(lng + copy * 0.5, lat, 0.02)]},
+            })
+            rows.append({**row.to_dict(), 'LocNombre': name})
+    esri_data = {'geometryType': 'esriGeometryPolygon', 'features': features}
+    return esri_data, rows
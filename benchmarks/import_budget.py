@@ -0,0 +1,153 @@
+"""
+Import-time budget for the map apps.
+
+Runs each app's top-level imports in a fresh interpreter with 'python -X importtime'
+and fails when they take longer than the budget or pull in a module that should
+only load behind the stage that uses it (folium, geopandas, matplotlib, ...).
+streamlit and pandas are imported first and not counted: every app needs them.
+
+The modules the apps import lazily get a second budget: each app's first render
+with the fixture CSV and polygon layer uploaded runs under AppTest, and every
+module imported during that run counts, except Streamlit's own internals, which
+a running server has already loaded.
+
+test_import_budget.py runs both checks under pytest.
+
+Usage:
+    python benchmarks/import_budget.py [--budget-ms 150] [--render-budget-ms 1500] [--repeat 3]
+"""
+import argparse
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+MAPS_DIR = REPO_DIR / "maps"
+APPS = [MAPS_DIR / "app.py", MAPS_DIR / "app2.py"]
+
+# Loaded before the app's own imports and left out of the budget
+BASELINE_IMPORTS = "import streamlit\nimport pandas\n"
+
+# Must not be imported before a file is uploaded
+HEAVY_MODULES = ["geopandas", "shapely", "folium", "branca", "matplotlib", "streamlit_folium"]
+
+DEFAULT_BUDGET_MS = 150
+DEFAULT_RENDER_BUDGET_MS = 1500
+
+MARKER = "--- app imports ---"
+END_MARKER = "--- end ---"
+
+# Runs the app once under AppTest with the benchmark fixtures as uploads
+FIRST_RENDER_SCRIPT = """
+import io, json, sys
+import pandas
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+import fixtures
+
+esri_data, rows = fixtures.build_polygon_layer(1)
+uploads = {'csv': pandas.DataFrame(rows).to_csv(index=False).encode('utf-8'),
+           'geojson': json.dumps(esri_data).encode('utf-8')}
+
+class Upload(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+st.file_uploader = lambda label, **kwargs: (Upload(uploads['csv'], 'localidades.csv') if 'CSV' in label
+                                            else Upload(uploads['geojson'], 'layer.geojson'))
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+sys.stderr.write(MARKER + '\\n')
+app.run()
+sys.stderr.write(END_MARKER + '\\n')
+print(len(app.exception))
+"""
+
+
+def top_level_imports(app_file):
+    """Source of the module-level import statements of an app"""
+    source = Path(app_file).read_text(encoding='utf-8')
+    tree = ast.parse(source)
+    return [ast.get_source_segment(source, node) for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def measure_imports(app_file):
+    """
+    Import the app's top-level modules in a fresh interpreter.
+
+    Returns:
+        tuple: (milliseconds spent in the app's imports, heavy modules that got loaded)
+    """
+    code = (BASELINE_IMPORTS
+            + f"import sys\nsys.stderr.write({MARKER!r} + '\\n')\n"
+            + "\n".join(top_level_imports(app_file))
+            + f"\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=Path(app_file).parent,
+                            capture_output=True, text=True, check=True)
+
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return _import_ms(result.stderr.split(MARKER, 1)[1]), loaded
+
+
+def _import_ms(importtime_log, skip_prefix=None):
+    """Total of the outermost imports in a '-X importtime' log"""
+    total_us = 0
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented below the module that triggered them
+        if name[1:].startswith(" ") or (skip_prefix and name.strip().startswith(skip_prefix)):
+            continue
+        total_us += int(cumulative)
+    return total_us / 1000
+
+
+def measure_first_render(app_file):
+    """
+    Import time of everything an app loads during its first render with files uploaded.
+
+    Returns:
+        tuple: (milliseconds spent in imports during the run, number of exceptions the app raised)
+    """
+    code = (f"MARKER, END_MARKER = {MARKER!r}, {END_MARKER!r}\n" + FIRST_RENDER_SCRIPT)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code, str(Path(app_file).resolve())],
+                            cwd=REPO_DIR / "benchmarks", capture_output=True, text=True, check=True)
+    render_log = result.stderr.split(MARKER, 1)[1].split(END_MARKER, 1)[0]
+    return _import_ms(render_log, skip_prefix="streamlit."), int(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the map apps")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Maximum time for an app's own top-level imports")
+    parser.add_argument("--render-budget-ms", type=float, default=DEFAULT_RENDER_BUDGET_MS,
+                        help="Maximum time for the imports of an app's first render")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per app; the fastest one counts")
+    args = parser.parse_args()
+
+    failed = False
+    for app_file in APPS:
+        runs = [measure_imports(app_file) for _ in range(args.repeat)]
+        best_ms = min(ms for ms, _ in runs)
+        loaded = runs[0][1]
+        ok = best_ms <= args.budget_ms and not loaded
+        failed = failed or not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {app_file.relative_to(REPO_DIR)}: "
+              f"{best_ms:.1f} ms (budget {args.budget_ms:.0f} ms)"
+              + (f", heavy modules imported at startup: {loaded}" if loaded else ""))
+
+        render_ms, errors = min(measure_first_render(app_file) for _ in range(args.repeat))
+        ok = render_ms <= args.render_budget_ms and not errors
+        failed = failed or not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {app_file.relative_to(REPO_DIR)} first render: "
+              f"{render_ms:.1f} ms (budget {args.render_budget_ms:.0f} ms)"
+              + (f", {errors} exceptions" if errors else ""))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark suite for the data pipeline and the map apps.
+
+Runs offline on the checked-in fixtures, times each stage at every requested
+scale, records peak Python memory with tracemalloc and saves the results as
+JSON under 'benchmarks/results/'. Each run is compared with the previous
+results file made with the same --pages (or --baseline) and regressions are
+reported.
+
+Usage:
+    python benchmarks/run.py [--scales 1,10,100] [--stages ingest,map_rendering]
+                             [--repeat 3] [--pages 10] [--baseline results/x.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from stages import STAGES
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+# A stage is reported as a regression when it gets this much slower or bigger than the baseline
+REGRESSION_THRESHOLD = 0.20
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _arrow_allocated():
+    pa = sys.modules.get('pyarrow')
+    return pa.total_allocated_bytes() if pa else 0
+
+
+def measure(run, repeat):
+    """
+    Best and mean wall time over repeat runs, then one traced run for peak memory.
+
+    tracemalloc does not see Arrow buffers, so the Arrow memory still held by
+    the stage's result is reported separately as 'arrow_mb'.
+    """
+    # Stages print progress like they do in the notebooks; keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()  # warm-up: imports, file cache
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+
+        # Only the calling process is traced, so stages with worker processes are
+        # measured through their in-process variant
+        arrow_before = _arrow_allocated()
+        tracemalloc.start()
+        output = getattr(run, 'memory_run', run)()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        arrow = _arrow_allocated() - arrow_before
+        del output
+    return {
+        'best_s': min(timings),
+        'mean_s': statistics.mean(timings),
+        'peak_mb': peak / 1e6,
+        'arrow_mb': max(arrow, 0) / 1e6,
+    }
+
+
+def run_suite(stages, scales, repeat, pages):
+    results = []
+    for scale in scales:
+        for name in stages:
+            with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as workdir:
+                run = STAGES[name](workdir, scale, pages)
+                result = {'stage': name, 'scale': scale, 'repeat': repeat, **measure(run, repeat)}
+            results.append(result)
+            print(f"  {name:<15} x{scale:<4} best {result['best_s']:.4f}s  "
+                  f"mean {result['mean_s']:.4f}s  peak {result['peak_mb']:.1f} MB  arrow {result['arrow_mb']:.1f} MB")
+    return results
+
+
+def results_pages(results_file):
+    with open(results_file, 'r', encoding='utf-8') as f:
+        return json.load(f).get('pages')
+
+
+def latest_results(exclude=None, pages=None):
+    """Most recent results file made with the same --pages"""
+    files = sorted(RESULTS_DIR.glob("*.json"))
+    files = [f for f in files if f != exclude and results_pages(f) == pages]
+    return files[-1] if files else None
+
+
+def compare(results, baseline_file):
+    """Print every stage next to its baseline; returns the ones that regressed"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {(r['stage'], r['scale']): r for r in json.load(f)['results']}
+
+    print(f"\nCompared with {baseline_file.name}:")
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['stage'], result['scale']))
+        if previous is None:
+            continue
+        for metric in ('best_s', 'peak_mb', 'arrow_mb'):
+            if metric not in previous:
+                continue
+            change = (result[metric] - previous[metric]) / previous[metric] if previous[metric] else 0
+            flag = "REGRESSION" if change > REGRESSION_THRESHOLD else ""
+            print(f"  {result['stage']:<15} x{result['scale']:<4} {metric:<8} "
+                  f"{previous[metric]:.4f} -> {result[metric]:.4f} ({change:+.0%}) {flag}")
+            if flag:
+                regressions.append((result['stage'], result['scale'], metric, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on the checked-in fixtures")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages")
+    parser.add_argument("--scales", default="1,10", help="Comma-separated fixture multipliers, e.g. 1,10,100")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage")
+    parser.add_argument("--pages", type=int, default=10,
+                        help="Listing pages used as the 1x ingest fixture (0 = all pages)")
+    parser.add_argument("--baseline", type=Path, help="Results file to compare with. Defaults to the latest one")
+    args = parser.parse_args()
+
+    stages = args.stages.split(",")
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {unknown}. Available: {list(STAGES)}")
+    scales = [int(s) for s in args.scales.split(",")]
+    if args.baseline and results_pages(args.baseline) != args.pages:
+        # The ingest fixture size depends on --pages, so the numbers are not comparable
+        parser.error(f"{args.baseline} was run with --pages {results_pages(args.baseline)}, not {args.pages}")
+
+    commit = git_commit()
+    print(f"Benchmarking {stages} at scales {scales} (commit {commit})")
+    results = run_suite(stages, scales, args.repeat, args.pages)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_file = RESULTS_DIR / f"{timestamp}_{commit}.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'timestamp': timestamp,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pages': args.pages,
+            'results': results,
+        }, f, indent=2)
+    print(f"\nSaved to {output_file}")
+
+    baseline_file = args.baseline or latest_results(exclude=output_file, pages=args.pages)
+    if baseline_file:
+        regressions = compare(results, baseline_file)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
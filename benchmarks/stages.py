@@ -0,0 +1,100 @@
+"""
+Pipeline stages under benchmark.
+
+Each stage is prepared once per scale (building its fixtures outside the timed
+region) and returns the zero-argument callable that gets timed. Stages that fan
+out to worker processes also set 'memory_run', an in-process variant used for
+the memory measurement, since tracemalloc only sees the calling process.
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import fixtures
+
+sys.path.insert(0, str(fixtures.AIRDNA_DIR))
+sys.path.insert(0, str(fixtures.REPO_DIR / "maps"))
+
+
+def prepare_ingest(workdir, scale, pages=None):
+    from ingest import read_listing_tables
+
+    listings_dir = fixtures.build_listings(workdir, scale, pages)
+
+    def run():
+        return read_listing_tables(listings_dir=listings_dir)
+    run.memory_run = lambda: read_listing_tables(listings_dir=listings_dir, max_workers=1)
+    return run
+
+
+def prepare_consolidation(workdir, scale, pages=None):
+    from details import consolidate_localidades
+
+    sources_dir, localidades = fixtures.build_details(workdir, scale)
+    output_csv = Path(workdir) / "localidades.csv"
+
+    def run():
+        output_csv.unlink(missing_ok=True)
+        return consolidate_localidades(localidades, sources_dir, output_csv)
+    return run
+
+
+def prepare_har_parsing(workdir, scale, pages=None):
+    from details import base_localidades, organize_har
+
+    har_file = fixtures.build_har(workdir, scale)
+    localidades = base_localidades()
+
+    def run():
+        with tempfile.TemporaryDirectory(dir=workdir) as output_dir:
+            return organize_har(har_file, localidades, base_output_dir=output_dir)
+    return run
+
+
+def prepare_classification(workdir, scale, pages=None):
+    import pandas as pd
+    from choropleth import CLASSIFICATION_METHODS, COLOR_SCHEMES, build_color_scale, classify, get_color_for_value
+
+    values = pd.Series(fixtures.build_map_values(scale), dtype='float64')
+    color_scale = build_color_scale(COLOR_SCHEMES['Reds (Light to Dark)'], 5)
+
+    def run():
+        for method in CLASSIFICATION_METHODS:
+            breaks = classify(values.dropna(), method, 5)
+            values.apply(lambda x: get_color_for_value(x, breaks, color_scale))
+    return run
+
+
+def prepare_map_rendering(workdir, scale, pages=None):
+    import pandas as pd
+    from choropleth import (COLOR_SCHEMES, build_color_scale, build_map, classify, clean_value,
+                            esri_features_frame, get_color_for_value, polygons_for_map)
+
+    esri_data, rows = fixtures.build_polygon_layer(scale)
+    df = pd.DataFrame(rows)
+
+    def run():
+        features_df = esri_features_frame(esri_data)
+        csv_df = df.copy()
+        csv_df['match_key'] = csv_df['LocNombre'].apply(clean_value)
+        features_df['match_key'] = features_df['LocNombre'].apply(clean_value)
+        merged_df = features_df.merge(csv_df, on='match_key', how='inner', suffixes=('_geo', '_csv'))
+
+        valid_data = merged_df['listing_count'].dropna()
+        color_scale = build_color_scale(COLOR_SCHEMES['Reds (Light to Dark)'], 5)
+        breaks = classify(valid_data, "Quantiles (Equal Count)", 5)
+        merged_df['color'] = merged_df['listing_count'].apply(lambda x: get_color_for_value(x, breaks, color_scale))
+
+        polygons_list, center, _ = polygons_for_map(merged_df, 'listing_count')
+        m = build_map(polygons_list, center, color_scale, valid_data.min(), valid_data.max(), 'Listing Count')
+        return m._repr_html_()
+    return run
+
+
+STAGES = {
+    'ingest': prepare_ingest,
+    'consolidation': prepare_consolidation,
+    'har_parsing': prepare_har_parsing,
+    'classification': prepare_classification,
+    'map_rendering': prepare_map_rendering,
+}
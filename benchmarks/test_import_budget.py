@@ -0,0 +1,22 @@
+"""Fails when an app's startup or first-render imports exceed the budget (see import_budget.py)"""
+import pytest
+
+from import_budget import (APPS, DEFAULT_BUDGET_MS, DEFAULT_RENDER_BUDGET_MS, REPO_DIR, measure_first_render,
+                           measure_imports)
+
+REPEAT = 3
+
+
+@pytest.mark.parametrize("app_file", APPS, ids=lambda path: path.name)
+def test_startup_imports(app_file):
+    runs = [measure_imports(app_file) for _ in range(REPEAT)]
+    best_ms = min(ms for ms, _ in runs)
+    assert not runs[0][1], f"heavy modules imported at startup: {runs[0][1]}"
+    assert best_ms <= DEFAULT_BUDGET_MS, f"{app_file.relative_to(REPO_DIR)}: {best_ms:.1f} ms"
+
+
+@pytest.mark.parametrize("app_file", APPS, ids=lambda path: path.name)
+def test_first_render_imports(app_file):
+    render_ms, errors = min(measure_first_render(app_file) for _ in range(REPEAT))
+    assert not errors, f"{app_file.relative_to(REPO_DIR)} raised {errors} exceptions on first render"
+    assert render_ms <= DEFAULT_RENDER_BUDGET_MS, f"{app_file.relative_to(REPO_DIR)}: {render_ms:.1f} ms"
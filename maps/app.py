@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
 import json
-import geopandas as gpd
-from shapely.geometry import shape, Polygon, MultiPolygon
 import numpy as np
 
+from exports import csv_download, data_hash, export_key
+from profiling import start_profiler
+
 st.set_page_config(layout="wide")
 st.title("🗺️ Working ArcGIS GeoJSON Map")
+profiler = start_profiler("app")
 
 # Upload files
 csv_file = st.file_uploader("1. Upload CSV", type=["csv"])
@@ -14,7 +16,8 @@ geojson_file = st.file_uploader("2. Upload ArcGIS GeoJSON", type=["geojson", "js
 
 if csv_file and geojson_file:
     # ========== LOAD CSV ==========
-    df = pd.read_csv(csv_file)
+    with profiler.span("read_csv"):
+        df = pd.read_csv(csv_file)
     st.write(f"📊 CSV loaded: {len(df)} rows, columns: {list(df.columns)}")
     
     # Show CSV preview
@@ -22,7 +25,8 @@ if csv_file and geojson_file:
         st.dataframe(df.head(20))
     
     # ========== LOAD ARCGIS GEOJSON ==========
-    esri_data = json.load(geojson_file)
+    with profiler.span("json.load"):
+        esri_data = json.load(geojson_file)
     
     st.subheader("🔍 ArcGIS File Structure")
     st.write(f"File keys: {list(esri_data.keys())}")
@@ -37,22 +41,23 @@ if csv_file and geojson_file:
     st.write(f"Sample feature keys: {list(sample_feature.keys())}")
     
     # Process each feature
-    for i, feature in enumerate(esri_data['features']):
-        # Get attributes (where your data is)
-        attrs = feature.get('attributes', {})
-        
-        # Get geometry
-        geom_data = feature.get('geometry', {})
+    with profiler.span("features_list"):
+        for i, feature in enumerate(esri_data['features']):
+            # Get attributes (where your data is)
+            attrs = feature.get('attributes', {})
+            
+            # Get geometry
+            geom_data = feature.get('geometry', {})
+            
+            # Store everything
+            features_list.append({
+                'index': i,
+                **attrs,  # Spread all attributes
+                'geometry_raw': geom_data
+            })
         
-        # Store everything
-        features_list.append({
-            'index': i,
-            **attrs,  # Spread all attributes
-            'geometry_raw': geom_data
-        })
-    
-    # Create DataFrame
-    features_df = pd.DataFrame(features_list)
+        # Create DataFrame
+        features_df = pd.DataFrame(features_list)
     
     st.write(f"✅ Processed {len(features_df)} features")
     st.write(f"📋 Columns in features: {list(features_df.columns)}")
@@ -114,8 +119,9 @@ if csv_file and geojson_file:
         return str(val).strip().lower()
     
     # Clean both datasets
-    df['match_key'] = df[csv_loc_col].apply(clean_value)
-    features_df['match_key'] = features_df[feature_loc_col].apply(clean_value)
+    with profiler.span("match_keys"):
+        df['match_key'] = df[csv_loc_col].apply(clean_value)
+        features_df['match_key'] = features_df[feature_loc_col].apply(clean_value)
     
     # Show unique values
     col1, col2 = st.columns(2)
@@ -132,7 +138,8 @@ if csv_file and geojson_file:
             st.write(f"  `{val}`")
     
     # ========== MERGE ==========
-    merged_df = features_df.merge(df, on='match_key', how='inner', suffixes=('_geo', '_csv'))
+    with profiler.span("merge"):
+        merged_df = features_df.merge(df, on='match_key', how='inner', suffixes=('_geo', '_csv'))
     
     st.write(f"✅ Matched {len(merged_df)} out of {len(df)} CSV rows")
     
@@ -159,41 +166,45 @@ if csv_file and geojson_file:
             st.write("Converting polygon geometries...")
             
             # Convert esri polygon rings to shapely polygons
-            polygons = []
-            centroids = []
+            with profiler.span("polygons"):
+                # shapely is only needed for polygon layers, import it here to keep cold starts fast
+                from shapely.geometry import Polygon
+                
+                polygons = []
+                centroids = []
             
-            for idx, row in merged_df.iterrows():
-                geom_data = row['geometry_raw']
+                for idx, row in merged_df.iterrows():
+                    geom_data = row['geometry_raw']
                 
-                if geom_data and 'rings' in geom_data:
-                    rings = geom_data['rings']
+                    if geom_data and 'rings' in geom_data:
+                        rings = geom_data['rings']
                     
-                    # First ring is exterior, rest are holes
-                    if rings and len(rings) > 0:
-                        exterior = rings[0]
+                        # First ring is exterior, rest are holes
+                        if rings and len(rings) > 0:
+                            exterior = rings[0]
                         
-                        # Convert to shapely polygon
-                        # Esri coordinates are [x, y] = [lon, lat]
-                        polygon_coords = [(coord[0], coord[1]) for coord in exterior]
+                            # Convert to shapely polygon
+                            # Esri coordinates are [x, y] = [lon, lat]
+                            polygon_coords = [(coord[0], coord[1]) for coord in exterior]
                         
-                        try:
-                            polygon = Polygon(polygon_coords)
-                            polygons.append(polygon)
+                            try:
+                                polygon = Polygon(polygon_coords)
+                                polygons.append(polygon)
                             
-                            # Get centroid for mapping
-                            centroid = polygon.centroid
-                            centroids.append((centroid.y, centroid.x))  # lat, lon
+                                # Get centroid for mapping
+                                centroid = polygon.centroid
+                                centroids.append((centroid.y, centroid.x))  # lat, lon
                             
-                        except Exception as e:
-                            st.write(f"Error converting polygon {idx}: {e}")
+                            except Exception as e:
+                                st.write(f"Error converting polygon {idx}: {e}")
+                                polygons.append(None)
+                                centroids.append((None, None))
+                        else:
                             polygons.append(None)
                             centroids.append((None, None))
                     else:
                         polygons.append(None)
                         centroids.append((None, None))
-                else:
-                    polygons.append(None)
-                    centroids.append((None, None))
             
             # Add centroids to dataframe
             merged_df['latitude'] = [c[0] for c in centroids]
@@ -206,7 +217,8 @@ if csv_file and geojson_file:
                 st.write(f"✅ {len(map_df)} features with valid geometry")
                 
                 # Display on map
-                st.map(map_df[['latitude', 'longitude']])
+                with profiler.span("st.map"):
+                    st.map(map_df[['latitude', 'longitude']])
                 
                 # Show data table
                 with st.expander("📋 View Mapped Data"):
@@ -273,19 +285,12 @@ if csv_file and geojson_file:
         # ========== DOWNLOAD ==========
         st.subheader("💾 Download Results")
         
-        # Prepare download data
-        download_df = merged_df.copy()
-        
-        # Remove geometry_raw column for CSV download
-        if 'geometry_raw' in download_df.columns:
-            download_df = download_df.drop(columns=['geometry_raw'])
-        
-        # Convert to CSV
-        csv_data = download_df.to_csv(index=False)
+        # The CSV is only built when the button is clicked, then cached per uploaded data
+        download_key = export_key(data_hash(csv_file, geojson_file, extra=(csv_loc_col, feature_loc_col)))
         
         st.download_button(
             label="📥 Download Merged Data (CSV)",
-            data=csv_data,
+            data=csv_download(merged_df, download_key),
             file_name="merged_data.csv",
             mime="text/csv"
         )
@@ -307,4 +312,6 @@ else:
     1. Check the "View CSV Data" expander to see your data
     2. Check the "View Feature Data" expander to see GeoJSON attributes
     3. Make sure region names match exactly (case insensitive)
-    """)
\ No newline at end of file
+    """)
+
+profiler.finish()
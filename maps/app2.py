@@ -1,17 +1,56 @@
 import streamlit as st
 import pandas as pd
 import json
-import geopandas as gpd
-from shapely.geometry import shape, Polygon, MultiPolygon
-import numpy as np
-import folium
-from streamlit_folium import st_folium, folium_static
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
-from branca.colormap import LinearColormap
+import sys
+from pathlib import Path
+
+from choropleth import (
+    CLASSIFICATION_METHODS, COLOR_SCHEMES, add_listing_markers, build_color_scale, build_map, classify,
+    clean_value, esri_features_frame, get_color_for_value, legend_rows, polygons_for_map,
+)
+from exports import csv_download, data_hash, export_key, html_download, html_export, map_html_download
+from profiling import start_profiler
+from small_multiples import DEFAULT_METRICS, small_multiples_for
+
+# search.py lives in airdna/, next to this folder
+sys.path.append(str(Path(__file__).resolve().parents[1] / "airdna"))
 
 st.set_page_config(layout="wide")
 st.title("🗺️ Presencia de Airbnb por localidades en Bogotá")
+profiler = start_profiler("app2")
+
+
+@st.cache_resource
+def title_index():
+    from search import load_title_index
+
+    return load_title_index()
+
+
+# ========== LISTING SEARCH ==========
+search_query = st.sidebar.text_input("🔎 Search listings by title", placeholder="ATTIK, Zona T, Virrey...")
+search_results, selected_listing, comparables_df = [], None, None
+if search_query:
+    with profiler.span("title_search"):
+        search_results = title_index().search(search_query)
+    st.sidebar.caption(f"{len(search_results)} listings found")
+
+    if search_results:
+        labels = {r['property_id']: f"{r['title']} ({r['property_id']})" for r in search_results}
+        selected_id = st.sidebar.selectbox("Compare with similar listings:", list(labels), format_func=labels.get)
+        selected_listing = next(r for r in search_results if r['property_id'] == selected_id)
+        with profiler.span("comparables"):
+            from search import comparables
+
+            comparables_df = comparables(selected_listing)
+
+# Search results plus the comparables of the selected one, for the map
+comparable_ids = [] if comparables_df is None else comparables_df['property_id'].tolist()
+result_ids = {r['property_id'] for r in search_results}
+marker_listings = search_results + [
+    row for row in ([] if comparables_df is None else comparables_df.to_dict('records'))
+    if row['property_id'] not in result_ids
+]
 
 # Upload files
 csv_file = st.file_uploader("1. Upload CSV", type=["csv"])
@@ -19,7 +58,8 @@ geojson_file = st.file_uploader("2. Upload ArcGIS GeoJSON", type=["geojson", "js
 
 if csv_file and geojson_file:
     # ========== LOAD CSV ==========
-    df = pd.read_csv(csv_file)
+    with profiler.span("read_csv"):
+        df = pd.read_csv(csv_file)
     st.write(f"📊 CSV loaded: {len(df)} rows, columns: {list(df.columns)}")
     
     # Show CSV preview
@@ -27,7 +67,8 @@ if csv_file and geojson_file:
         st.dataframe(df.head(20))
     
     # ========== LOAD ARCGIS GEOJSON ==========
-    esri_data = json.load(geojson_file)
+    with profiler.span("json.load"):
+        esri_data = json.load(geojson_file)
     
     st.subheader("🔍 ArcGIS File Structure")
     st.write(f"File keys: {list(esri_data.keys())}")
@@ -35,29 +76,13 @@ if csv_file and geojson_file:
     # ========== DIRECT CONVERSION ==========
     st.subheader("🔄 Converting Features")
     
-    features_list = []
-    
     # Check what's in the features
     sample_feature = esri_data['features'][0] if esri_data['features'] else {}
     st.write(f"Sample feature keys: {list(sample_feature.keys())}")
     
-    # Process each feature
-    for i, feature in enumerate(esri_data['features']):
-        # Get attributes (where your data is)
-        attrs = feature.get('attributes', {})
-        
-        # Get geometry
-        geom_data = feature.get('geometry', {})
-        
-        # Store everything
-        features_list.append({
-            'index': i,
-            **attrs,  # Spread all attributes
-            'geometry_raw': geom_data
-        })
-    
-    # Create DataFrame
-    features_df = pd.DataFrame(features_list)
+    # One row per feature with its attributes and raw geometry
+    with profiler.span("features_list"):
+        features_df = esri_features_frame(esri_data)
     
     st.write(f"✅ Processed {len(features_df)} features")
     st.write(f"📋 Columns in features: {list(features_df.columns)}")
@@ -98,15 +123,10 @@ if csv_file and geojson_file:
     # ========== CLEAN AND MATCH ==========
     st.subheader("🔗 Match Data")
     
-    # Simple cleaning function
-    def clean_value(val):
-        if pd.isna(val) or val is None:
-            return ""
-        return str(val).strip().lower()
-    
     # Clean both datasets
-    df['match_key'] = df[csv_loc_col].apply(clean_value)
-    features_df['match_key'] = features_df[feature_loc_col].apply(clean_value)
+    with profiler.span("match_keys"):
+        df['match_key'] = df[csv_loc_col].apply(clean_value)
+        features_df['match_key'] = features_df[feature_loc_col].apply(clean_value)
     
     # Show unique values
     col1, col2 = st.columns(2)
@@ -123,7 +143,8 @@ if csv_file and geojson_file:
             st.write(f"  `{val}`")
     
     # ========== MERGE ==========
-    merged_df = features_df.merge(df, on='match_key', how='inner', suffixes=('_geo', '_csv'))
+    with profiler.span("merge"):
+        merged_df = features_df.merge(df, on='match_key', how='inner', suffixes=('_geo', '_csv'))
     
     st.write(f"✅ Matched {len(merged_df)} out of {len(df)} CSV rows")
     
@@ -172,36 +193,29 @@ if csv_file and geojson_file:
                         st.metric("Median", int(valid_data.median()))
                     
                     # Histogram
-                    fig, ax = plt.subplots(figsize=(10, 4))
-                    ax.hist(valid_data, bins=20, edgecolor='black', alpha=0.7, color='skyblue')
-                    ax.set_xlabel('Listing Count')
-                    ax.set_ylabel('Frequency')
-                    ax.set_title('Distribution of Listing Counts')
-                    ax.grid(True, alpha=0.3)
-                    st.pyplot(fig)
+                    with profiler.span("histogram"):
+                        import matplotlib.pyplot as plt
+                        
+                        fig, ax = plt.subplots(figsize=(10, 4))
+                        ax.hist(valid_data, bins=20, edgecolor='black', alpha=0.7, color='skyblue')
+                        ax.set_xlabel('Listing Count')
+                        ax.set_ylabel('Frequency')
+                        ax.set_title('Distribution of Listing Counts')
+                        ax.grid(True, alpha=0.3)
+                        st.pyplot(fig)
                 
                 # ========== COLOR SCALE SELECTION ==========
                 st.write("### Color Scale Configuration")
                 
-                # Define color schemes (darker = higher values)
-                color_schemes = {
-                    'Reds (Light to Dark)': ['#ffe6e6', '#ffb3b3', '#ff8080', '#ff4d4d', '#ff1a1a', '#e60000', '#b30000'],
-                    'Blues (Light to Dark)': ['#e6f2ff', '#b3d9ff', '#80bfff', '#4da6ff', '#1a8cff', '#0073e6', '#0059b3'],
-                    'Greens (Light to Dark)': ['#e6ffe6', '#b3ffb3', '#80ff80', '#4dff4d', '#1aff1a', '#00e600', '#00b300'],
-                    'Purples (Light to Dark)': ['#f2e6ff', '#d9b3ff', '#bf80ff', '#a64dff', '#8c1aff', '#7300e6', '#5900b3'],
-                    'Oranges (Light to Dark)': ['#fff0e6', '#ffd1b3', '#ffb380', '#ff944d', '#ff751a', '#e65c00', '#b34700'],
-                    'Greys (Light to Dark)': ['#f2f2f2', '#d9d9d9', '#bfbfbf', '#a6a6a6', '#8c8c8c', '#737373', '#595959'],
-                }
-                
-                # Let user select color scheme
+                # Let user select color scheme (darker = higher values)
                 selected_scheme = st.selectbox(
                     "Select color scheme (darker colors = higher listing counts):",
-                    list(color_schemes.keys()),
+                    list(COLOR_SCHEMES.keys()),
                     index=0
                 )
                 
                 # Get the selected color palette
-                color_palette = color_schemes[selected_scheme]
+                color_palette = COLOR_SCHEMES[selected_scheme]
                 
                 # Number of color classes
                 num_classes = st.slider(
@@ -213,73 +227,28 @@ if csv_file and geojson_file:
                 )
                 
                 # Create color map for the selected number of classes
-                if num_classes <= len(color_palette):
-                    color_scale = color_palette[:num_classes]
-                else:
-                    # Interpolate if more classes needed
-                    cmap = mcolors.LinearSegmentedColormap.from_list("custom", color_palette, N=num_classes)
-                    color_scale = [mcolors.to_hex(cmap(i)) for i in np.linspace(0, 1, num_classes)]
+                color_scale = build_color_scale(color_palette, num_classes)
                 
                 # Classification method
                 classification_method = st.radio(
                     "Classification method:",
-                    ["Equal Interval", "Quantiles (Equal Count)", "Natural Breaks (Jenks)"],
+                    CLASSIFICATION_METHODS,
                     horizontal=True
                 )
                 
                 # Classify data
-                if classification_method == "Equal Interval":
-                    # Equal interval classification
-                    min_val = valid_data.min()
-                    max_val = valid_data.max() +1
-                    breaks = np.linspace(min_val, max_val, num_classes + 1)
-                    
-                elif classification_method == "Quantiles (Equal Count)":
-                    # Quantile classification
-                    quantiles = np.linspace(0, 1, num_classes + 1)
-                    breaks = valid_data.quantile(quantiles).tolist()
-                    
-                else:  # Natural Breaks approximation
-                    # Simple approximation of natural breaks
-                    sorted_data = np.sort(valid_data)
-                    # Create initial breaks
-                    breaks = [sorted_data[0]]
-                    for i in range(1, num_classes):
-                        idx = int(len(sorted_data) * i / num_classes)
-                        breaks.append(sorted_data[idx])
-                    breaks.append(sorted_data[-1])
-                
-                # Ensure breaks are unique and sorted
-                breaks = sorted(list(set(breaks)))
-                
-                # Assign colors based on classification
-                def get_color_for_value(value, breaks, color_scale):
-                    if pd.isna(value):
-                        return '#cccccc'  # Gray for missing values
-                    
-                    for i in range(len(breaks) - 1):
-                        if breaks[i] <= value <= breaks[i + 1]:
-                            return color_scale[i]
-                    # If value is outside range, use last color
-                    return color_scale[-1]
+                with profiler.span("classify"):
+                    breaks = classify(valid_data, classification_method, num_classes)
                 
                 # Apply color assignment
-                merged_df['color'] = merged_df[listing_col].apply(
-                    lambda x: get_color_for_value(x, breaks, color_scale)
-                )
+                with profiler.span("get_color_for_value"):
+                    merged_df['color'] = merged_df[listing_col].apply(
+                        lambda x: get_color_for_value(x, breaks, color_scale)
+                    )
                 
                 # Create a legend
                 st.write("### Color Legend")
-                legend_data = []
-                for i in range(len(color_scale)):
-                    lower_bound = breaks[i]
-                    upper_bound = breaks[i + 1] if i < len(breaks) - 1 else "∞"
-                    legend_data.append({
-                        'Color': color_scale[i],
-                        'Range': f"{lower_bound:.0f} - {upper_bound:.0f}",
-                        'Count': ((merged_df[listing_col] >= lower_bound) & 
-                                 (merged_df[listing_col] < upper_bound)).sum()
-                    })
+                legend_data = legend_rows(merged_df[listing_col], breaks, color_scale)
                 
                 # Display legend as colored boxes
                 legend_cols = st.columns(num_classes)
@@ -317,87 +286,29 @@ if csv_file and geojson_file:
         if 'esriGeometryPolygon' in geometry_type:
             st.write("Creating map with graduated colors...")
             
-            # Create a base map
-            # Find center of all polygons
-            all_lats = []
-            all_lons = []
-            polygons_list = []
-            print(merged_df.columns)
-
-            for idx, row in merged_df.iterrows():
-                geom_data = row['geometry_raw']
-                
-                if geom_data and 'rings' in geom_data:
-                    rings = geom_data['rings']
-                    
-                    if rings and len(rings) > 0:
-                        exterior = rings[0]
-                        polygon_coords = [(coord[1], coord[0]) for coord in exterior]  # lat, lon
-                        
-                        try:
-                            # Create polygon for Folium
-                            polygons_list.append({
-                                'polygon': polygon_coords,
-                                'color': row.get('color', '#3388ff') if listing_col else '#3388ff',
-                                'name': row.get('LocNombre_geo', f"Feature {idx}"),
-                                'listing_count': row[listing_col] if listing_col else "N/A",
-                                'category': row.get('listing_category', 'N/A')
-                            })
-                            
-                            # Add to center calculation
-                            for coord in polygon_coords:
-                                all_lats.append(coord[0])
-                                all_lons.append(coord[1])
-                                
-                        except Exception as e:
-                            st.write(f"Error processing polygon {idx}: {e}")
+            # Convert rings to Folium polygons and find the center of all of them
+            with profiler.span("polygons"):
+                polygons_list, center, errors = polygons_for_map(merged_df, listing_col)
+            for error in errors:
+                st.write(error)
             
             if polygons_list:
-                # Calculate map center
-                if all_lats and all_lons:
-                    center_lat = sum(all_lats) / len(all_lats)
-                    center_lon = sum(all_lons) / len(all_lons)
-                else:
-                    center_lat, center_lon = 0, 0
-                
-                # Create Folium map
-                m = folium.Map(location=[center_lat, center_lon], zoom_start=10)
-                # Add polygons to map with graduated colors
-                for poly_data in polygons_list:
-
-                    # Create popup content
-                    popup_content = f"""
-                    <div style="font-family: Arial; min-width: 200px;">
-                        <h4 style="margin-bottom: 5px;">{poly_data['name']}</h4>
-                        <hr style="margin: 5px 0;">
-                        <b>Airbnb Registered:</b> {poly_data['listing_count']}<br>
-                    </div>
-                    """
-                    
-                    # Add polygon to map
-                    folium.Polygon(
-                        locations=poly_data['polygon'],
-                        color='#000000',  # Border color
-                        weight=1,  # Border width
-                        fill=True,
-                        fill_color=poly_data['color'],
-                        fill_opacity=0.7,
-                        popup=folium.Popup(popup_content, max_width=300)
-                    ).add_to(m)
-                
-                # Add color legend to map if we have listing counts
-                if listing_col and 'color_scale' in locals():
-                    # Create a color legend
-                    colormap = LinearColormap(
-                        colors=color_scale,
-                        vmin=valid_data.min(),
-                        vmax=valid_data.max(),
-                        caption=f'Listing Count ({listing_col})'
-                    )
-                    colormap.add_to(m)
+                # Create Folium map, with a color legend if we have listing counts
+                with profiler.span("folium_map"):
+                    if listing_col and 'color_scale' in locals():
+                        m = build_map(polygons_list, center, color_scale,
+                                      vmin=valid_data.min(), vmax=valid_data.max(),
+                                      caption=f'Listing Count ({listing_col})')
+                    else:
+                        m = build_map(polygons_list, center)
+                    if marker_listings:
+                        add_listing_markers(m, marker_listings, selected_listing['property_id'], comparable_ids)
                 
                 # Display the map
-                folium_static(m, width=1200, height=600)
+                with profiler.span("folium_static"):
+                    from streamlit_folium import folium_static
+                    
+                    folium_static(m, width=1200, height=600)
                 
                 # Show data summary
                 st.write(f"### 📊 Mapped {len(polygons_list)} polygons")
@@ -419,24 +330,62 @@ if csv_file and geojson_file:
             st.warning(f"⚠️ Unsupported geometry type: {geometry_type}")
             st.info("This app works best with polygon data (esriGeometryPolygon).")
         
-        # ========== DOWNLOAD ==========
-        st.subheader("💾 Download Results")
+        # Exports are cached per data and colour settings; downloads are only built when a button is clicked
+        with profiler.span("export_key"):
+            search_key = (search_query, selected_listing['property_id'] if selected_listing else None)
+            data_key = data_hash(csv_file, geojson_file, extra=(csv_loc_col, feature_loc_col, search_key))
+            if listing_col and 'color_scale' in locals():
+                download_key = export_key(data_key, selected_scheme, num_classes, classification_method)
+            else:
+                download_key = export_key(data_key)
         
-        # Prepare download data
-        download_df = merged_df.copy()
+        # ========== SMALL MULTIPLES ==========
+        st.subheader("🧩 Compare Metrics Side by Side")
         
-        # Remove geometry_raw column for CSV download
-        if 'geometry_raw' in download_df.columns:
-            download_df = download_df.drop(columns=['geometry_raw'])
+        # Numeric columns that came from the CSV (suffixed '_csv' when the GeoJSON has the same name)
+        metric_columns = [
+            c for c in merged_df.columns
+            if (c in df.columns or (c.endswith('_csv') and c[:-4] in df.columns))
+            and c != 'match_key' and pd.api.types.is_numeric_dtype(merged_df[c])
+        ]
+        default_metrics = [c for c in DEFAULT_METRICS if c in metric_columns] or metric_columns[:4]
+        selected_metrics = st.multiselect("Metrics to compare:", metric_columns, default=default_metrics)
         
-        # Convert to CSV
-        csv_data = download_df.to_csv(index=False)
+        if selected_metrics and 'geometry_raw' in merged_df.columns:
+            name_col = f"{feature_loc_col}_geo" if f"{feature_loc_col}_geo" in merged_df.columns else feature_loc_col
+            # Same colours as the map above; the geometry is embedded once for all panels
+            if listing_col and 'color_scale' in locals():
+                colour_settings = (selected_scheme, num_classes, classification_method)
+            else:
+                colour_settings = ()
+            
+            def build_small_multiples():
+                return small_multiples_for(merged_df, selected_metrics, name_col, *colour_settings)
+            
+            # Built once per data, colour settings and metrics; reruns read the cached page
+            small_multiples_key = export_key(data_key, *colour_settings, extra=(tuple(selected_metrics), name_col))
+            with profiler.span("small_multiples"):
+                small_multiples_page = html_export(build_small_multiples, small_multiples_key).read_text(encoding='utf-8')
+            
+            import streamlit.components.v1 as components
+            
+            panel_rows = -(-len(selected_metrics) // 3)
+            components.html(small_multiples_page, height=panel_rows * 420 + 20, scrolling=True)
+            st.download_button(
+                label="🧩 Download Small Multiples (HTML)",
+                data=html_download(build_small_multiples, small_multiples_key),
+                file_name="small_multiples.html",
+                mime="text/html"
+            )
+        
+        # ========== DOWNLOAD ==========
+        st.subheader("💾 Download Results")
         
         col1, col2 = st.columns(2)
         with col1:
             st.download_button(
                 label="📥 Download Merged Data (CSV)",
-                data=csv_data,
+                data=csv_download(merged_df, download_key),
                 file_name="merged_data.csv",
                 mime="text/csv"
             )
@@ -444,10 +393,9 @@ if csv_file and geojson_file:
         # Also download the styled map as HTML if we created one
         if 'm' in locals():
             with col2:
-                map_html = m._repr_html_()
                 st.download_button(
                     label="🗺️ Download Map (HTML)",
-                    data=map_html,
+                    data=map_html_download(m, download_key),
                     file_name="graduated_colors_map.html",
                     mime="text/html"
                 )
@@ -472,4 +420,41 @@ else:
     - CSV must have a numeric `listing_count` column (or similar)
     - GeoJSON should contain polygon geometry (esriGeometryPolygon)
     - Location columns should match between files
-    """)
\ No newline at end of file
+    
+    ### 🔎 Listing search:
+    - Type part of a title in the sidebar ("ATTIK", "Zona T", "Virrey"); accents don't matter
+    - Matches are marked on the map, with the selected listing and its comparables highlighted
+    """)
+
+# ========== SEARCH RESULTS ==========
+if search_query:
+    st.subheader(f"🔎 Listings matching '{search_query}'")
+    if not search_results:
+        st.write("No listing titles match.")
+    else:
+        results_df = pd.DataFrame(search_results)
+        st.dataframe(results_df.drop(columns=['snapshots']))
+        if not (csv_file and geojson_file):
+            # Without the choropleth, show the matches on a plain map
+            st.map(pd.DataFrame(marker_listings).dropna(subset=['lat', 'lng']), latitude='lat', longitude='lng')
+
+        st.write(f"### Comparables of **{selected_listing['title']}**")
+        if comparables_df is None or comparables_df.empty:
+            st.write("No cleaned listings found for its localidad.")
+        else:
+            st.caption(f"Same localidad ({selected_listing['section']}), listing type "
+                       f"({selected_listing['listing_type']}) and bedrooms ({selected_listing['bedrooms']}), "
+                       "highest revenue first")
+            own = comparables_df[comparables_df['property_id'] == selected_listing['property_id']]
+            col1, col2, col3 = st.columns(3)
+            metrics = {'revenue_ltm': "Revenue (LTM)", 'occupancy_rate_ltm': "Occupancy % (LTM)",
+                       'average_daily_rate_ltm': "Daily rate (LTM)"}
+            for col, (metric, label) in zip((col1, col2, col3), metrics.items()):
+                with col:
+                    median = comparables_df[metric].median()
+                    value = own[metric].iloc[0] if len(own) else None
+                    st.metric(label, f"{value:,.0f}" if pd.notna(value) else "-",
+                              delta=f"{value - median:,.0f} vs median" if pd.notna(value) and pd.notna(median) else None)
+            st.dataframe(comparables_df)
+
+profiler.finish()
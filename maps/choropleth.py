@@ -0,0 +1,250 @@
+"""
+Graduated-colour choropleth building blocks shared by the map apps and the benchmarks.
+
+Everything here is plain Python over pandas/numpy/folium, without Streamlit, so
+it can be timed and reused outside a Streamlit session. folium, branca and
+matplotlib take most of a cold start to import, so they are only imported by the
+functions that use them.
+"""
+from html import escape
+
+import numpy as np
+import pandas as pd
+
+# Define color schemes (darker = higher values)
+COLOR_SCHEMES = {
+    'Reds (Light to Dark)': ['#ffe6e6', '#ffb3b3', '#ff8080', '#ff4d4d', '#ff1a1a', '#e60000', '#b30000'],
+    'Blues (Light to Dark)': ['#e6f2ff', '#b3d9ff', '#80bfff', '#4da6ff', '#1a8cff', '#0073e6', '#0059b3'],
+    'Greens (Light to Dark)': ['#e6ffe6', '#b3ffb3', '#80ff80', '#4dff4d', '#1aff1a', '#00e600', '#00b300'],
+    'Purples (Light to Dark)': ['#f2e6ff', '#d9b3ff', '#bf80ff', '#a64dff', '#8c1aff', '#7300e6', '#5900b3'],
+    'Oranges (Light to Dark)': ['#fff0e6', '#ffd1b3', '#ffb380', '#ff944d', '#ff751a', '#e65c00', '#b34700'],
+    'Greys (Light to Dark)': ['#f2f2f2', '#d9d9d9', '#bfbfbf', '#a6a6a6', '#8c8c8c', '#737373', '#595959'],
+}
+
+CLASSIFICATION_METHODS = ["Equal Interval", "Quantiles (Equal Count)", "Natural Breaks (Jenks)"]
+
+MISSING_COLOR = '#cccccc'
+DEFAULT_COLOR = '#3388ff'
+
+
+def esri_features_frame(esri_data):
+    """Flatten ArcGIS features into a DataFrame: one row per feature with its attributes and raw geometry"""
+    features_list = []
+    for i, feature in enumerate(esri_data['features']):
+        # Get attributes (where your data is)
+        attrs = feature.get('attributes', {})
+
+        # Get geometry
+        geom_data = feature.get('geometry', {})
+
+        # Store everything
+        features_list.append({
+            'index': i,
+            **attrs,  # Spread all attributes
+            'geometry_raw': geom_data
+        })
+    return pd.DataFrame(features_list)
+
+
+def clean_value(val):
+    """Normalize a location name for matching"""
+    if pd.isna(val) or val is None:
+        return ""
+    return str(val).strip().lower()
+
+
+def build_color_scale(color_palette, num_classes):
+    """Pick num_classes colours from the palette, interpolating if the palette is too short"""
+    if num_classes <= len(color_palette):
+        return color_palette[:num_classes]
+    # Interpolate if more classes needed
+    import matplotlib.colors as mcolors
+
+    cmap = mcolors.LinearSegmentedColormap.from_list("custom", color_palette, N=num_classes)
+    return [mcolors.to_hex(cmap(i)) for i in np.linspace(0, 1, num_classes)]
+
+
+def classify(valid_data, classification_method, num_classes):
+    """
+    Compute class breaks for the given values.
+
+    Args:
+        valid_data (pandas.Series): Numeric values without NaN
+        classification_method (str): One of CLASSIFICATION_METHODS
+        num_classes (int): Number of colour classes
+
+    Returns:
+        list: Sorted, unique class breaks
+    """
+    if classification_method == "Equal Interval":
+        # Equal interval classification
+        min_val = valid_data.min()
+        max_val = valid_data.max() + 1
+        breaks = np.linspace(min_val, max_val, num_classes + 1)
+
+    elif classification_method == "Quantiles (Equal Count)":
+        # Quantile classification
+        quantiles = np.linspace(0, 1, num_classes + 1)
+        breaks = valid_data.quantile(quantiles).tolist()
+
+    else:  # Natural Breaks approximation
+        # Simple approximation of natural breaks
+        sorted_data = np.sort(valid_data)
+        # Create initial breaks
+        breaks = [sorted_data[0]]
+        for i in range(1, num_classes):
+            idx = int(len(sorted_data) * i / num_classes)
+            breaks.append(sorted_data[idx])
+        breaks.append(sorted_data[-1])
+
+    # Ensure breaks are unique and sorted
+    return sorted(list(set(breaks)))
+
+
+def get_color_for_value(value, breaks, color_scale):
+    """Colour of the first class whose range contains value"""
+    if pd.isna(value):
+        return MISSING_COLOR  # Gray for missing values
+
+    for i in range(len(breaks) - 1):
+        if breaks[i] <= value <= breaks[i + 1]:
+            return color_scale[i]
+    # If value is outside range, use last color
+    return color_scale[-1]
+
+
+def legend_rows(values, breaks, color_scale):
+    """Range label and feature count for each colour class"""
+    legend_data = []
+    for i in range(len(color_scale)):
+        lower_bound = breaks[i]
+        upper_bound = breaks[i + 1] if i < len(breaks) - 1 else "∞"
+        legend_data.append({
+            'Color': color_scale[i],
+            'Range': f"{lower_bound:.0f} - {upper_bound:.0f}",
+            'Count': ((values >= lower_bound) &
+                      (values < upper_bound)).sum()
+        })
+    return legend_data
+
+
+def polygons_for_map(merged_df, listing_col):
+    """
+    Turn matched rows with esri rings into polygons ready for Folium.
+
+    Returns:
+        tuple: (polygons_list, (center_lat, center_lon), errors)
+    """
+    all_lats = []
+    all_lons = []
+    polygons_list = []
+    errors = []
+
+    for idx, row in merged_df.iterrows():
+        geom_data = row['geometry_raw']
+
+        if geom_data and 'rings' in geom_data:
+            rings = geom_data['rings']
+
+            if rings and len(rings) > 0:
+                exterior = rings[0]
+                polygon_coords = [(coord[1], coord[0]) for coord in exterior]  # lat, lon
+
+                try:
+                    # Create polygon for Folium
+                    polygons_list.append({
+                        'polygon': polygon_coords,
+                        'color': row.get('color', DEFAULT_COLOR) if listing_col else DEFAULT_COLOR,
+                        'name': row.get('LocNombre_geo', f"Feature {idx}"),
+                        'listing_count': row[listing_col] if listing_col else "N/A",
+                        'category': row.get('listing_category', 'N/A')
+                    })
+
+                    # Add to center calculation
+                    for coord in polygon_coords:
+                        all_lats.append(coord[0])
+                        all_lons.append(coord[1])
+
+                except Exception as e:
+                    errors.append(f"Error processing polygon {idx}: {e}")
+
+    # Calculate map center
+    if all_lats and all_lons:
+        center = (sum(all_lats) / len(all_lats), sum(all_lons) / len(all_lons))
+    else:
+        center = (0, 0)
+    return polygons_list, center, errors
+
+
+def build_map(polygons_list, center, color_scale=None, vmin=None, vmax=None, caption=None):
+    """Folium map with one filled polygon per feature and, when given, a colour legend"""
+    import folium
+    from branca.colormap import LinearColormap
+
+    m = folium.Map(location=list(center), zoom_start=10)
+    # Add polygons to map with graduated colors
+    for poly_data in polygons_list:
+
+        # Create popup content
+        popup_content = f"""
+        <div style="font-family: Arial; min-width: 200px;">
+            <h4 style="margin-bottom: 5px;">{poly_data['name']}</h4>
+            <hr style="margin: 5px 0;">
+            <b>Airbnb Registered:</b> {poly_data['listing_count']}<br>
+        </div>
+        """
+
+        # Add polygon to map
+        folium.Polygon(
+            locations=poly_data['polygon'],
+            color='#000000',  # Border color
+            weight=1,  # Border width
+            fill=True,
+            fill_color=poly_data['color'],
+            fill_opacity=0.7,
+            popup=folium.Popup(popup_content, max_width=300)
+        ).add_to(m)
+
+    if color_scale is not None:
+        # Create a color legend
+        colormap = LinearColormap(
+            colors=color_scale,
+            vmin=vmin,
+            vmax=vmax,
+            caption=caption
+        )
+        colormap.add_to(m)
+    return m
+
+
+def add_listing_markers(m, listings, selected_id=None, comparable_ids=()):
+    """
+    Mark title search results on a folium map.
+
+    The selected listing is drawn larger in red and its comparables in orange;
+    listings without coordinates are skipped.
+
+    Returns:
+        int: Number of markers added
+    """
+    import folium
+
+    comparable_ids = set(comparable_ids)
+    added = 0
+    for listing in listings:
+        if pd.isna(listing.get('lat')) or pd.isna(listing.get('lng')):
+            continue
+        selected = listing['property_id'] == selected_id
+        color = '#d62728' if selected else '#ff7f0e' if listing['property_id'] in comparable_ids else '#1f77b4'
+        folium.CircleMarker(
+            location=[listing['lat'], listing['lng']],
+            radius=9 if selected else 5,
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.9,
+            popup=folium.Popup(f"<b>{escape(listing.get('title') or '')}</b><br>{listing['property_id']}",
+                               max_width=300),
+        ).add_to(m)
+        added += 1
+    return added
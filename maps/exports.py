@@ -0,0 +1,107 @@
+"""
+On-demand downloads for the map apps.
+
+The merged CSV and the map HTML used to be serialized on every rerun just to
+feed the download buttons. Here each download is a callable that Streamlit
+only runs when the button is clicked. The artifact is written straight to a
+file in EXPORT_DIR, keyed by the uploaded data and the colour settings, so
+repeated clicks and reruns with the same settings reuse it. The callables
+hand Streamlit the opened file rather than a copy of its bytes.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+EXPORT_DIR = Path(tempfile.gettempdir()) / "maps_exports"
+
+# Oldest artifacts are deleted once the cache holds more files than this
+MAX_CACHED_EXPORTS = 32
+
+
+def data_hash(*uploads, extra=()):
+    """
+    Hash of the uploaded files' contents plus any settings the merged data depends on.
+
+    Args:
+        uploads: Streamlit UploadedFile objects (anything with getbuffer())
+        extra: Values such as the selected matching columns
+
+    Returns:
+        str: 16 hex characters
+    """
+    digest = hashlib.sha1()
+    for upload in uploads:
+        digest.update(upload.getbuffer())
+    for value in extra:
+        digest.update(repr(value).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def export_key(data_key, scheme=None, num_classes=None, method=None, extra=()):
+    """Cache key for one artifact: (data hash, colour scheme, classes, classification method, extra settings)"""
+    settings = repr((scheme, num_classes, method, *extra)).encode('utf-8')
+    return f"{data_key}_{hashlib.sha1(settings).hexdigest()[:8]}"
+
+
+def _prune(keep=MAX_CACHED_EXPORTS):
+    files = sorted(EXPORT_DIR.glob("*.*"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in files[keep:]:
+        path.unlink(missing_ok=True)
+
+
+def cached_export(key, suffix, write):
+    """
+    Path of the cached artifact for key, building it with write(path) on a miss.
+
+    The file is written under a temporary name and renamed into place, so a
+    concurrent click never serves a half-written file.
+    """
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    path = EXPORT_DIR / f"{key}{suffix}"
+    if path.exists():
+        os.utime(path)  # keep recently used artifacts out of _prune()
+        return path
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{key}", suffix=suffix, dir=EXPORT_DIR)
+    os.close(fd)
+    try:
+        write(Path(tmp_name))
+        os.replace(tmp_name, path)
+    finally:
+        Path(tmp_name).unlink(missing_ok=True)
+    _prune()
+    return path
+
+
+def csv_download(merged_df, key):
+    """Callable for st.download_button that builds the merged CSV (without geometry) when clicked"""
+    def build():
+        def write(path):
+            merged_df.drop(columns=['geometry_raw'], errors='ignore').to_csv(path, index=False)
+        return open(cached_export(key, ".csv", write), 'rb')
+    return build
+
+
+def map_html_download(m, key):
+    """Callable for st.download_button that serializes the folium map when clicked"""
+    def build():
+        def write(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(m._repr_html_())
+        return open(cached_export(key, ".html", write), 'rb')
+    return build
+
+
+def html_export(build, key):
+    """Path of the cached HTML page for key, calling build() for its text on a miss"""
+    def write(path):
+        path.write_text(build(), encoding='utf-8')
+    return cached_export(key, ".html", write)
+
+
+def html_download(build, key):
+    """Callable for st.download_button that serves the cached page, rebuilding it if it was pruned"""
+    def download():
+        return open(html_export(build, key), 'rb')
+    return download
@@ -0,0 +1,189 @@
+"""
+Lightweight per-stage profiling for the Streamlit map apps.
+
+Wrap a stage with ``with profiler.span("name"):`` (or decorate a function with
+``@profiler.profiled("name")``) to record wall time, CPU time and the bytes
+allocated while it runs. Spans nest, are shown in an optional sidebar panel
+and can be appended to a JSONL log.
+
+Profiling is off unless the MAPS_PROFILE environment variable is set or the
+sidebar toggle is switched on for the session. When off, span() hands back a
+shared no-op context manager, so leaving the hooks in place costs one
+attribute check per stage.
+
+tracemalloc is process-wide: while any profiled run is active, allocations of
+every session are traced, and 'alloc KB'/'peak KB' include whatever other
+sessions allocate at the same time. Tracing is reference-counted across
+profilers and stops when the last one finishes. A run that Streamlit stops
+early never reaches finish(), so its reference is also released when the
+profiler is garbage collected. Peaks can only be reset while a single run is
+being profiled; spans that overlap another profiled run report no peak.
+
+CPU time is the session's own thread (time.thread_time), so other sessions
+running at the same time don't inflate it.
+
+Environment:
+    MAPS_PROFILE=1               profile every run of every session
+    MAPS_PROFILE_LOG=path.jsonl  append one JSON line per span
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+import weakref
+from datetime import datetime
+
+import streamlit as st
+
+_NULL_SPAN = contextlib.nullcontext()
+
+_tracing_lock = threading.Lock()
+_tracing = {'users': 0, 'started': False, 'generation': 0}
+
+
+def _acquire_tracing():
+    with _tracing_lock:
+        if _tracing['users'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing['started'] = True
+        _tracing['users'] += 1
+        _tracing['generation'] += 1
+
+
+def _release_tracing():
+    with _tracing_lock:
+        _tracing['users'] -= 1
+        if _tracing['users'] == 0 and _tracing['started']:
+            tracemalloc.stop()
+            _tracing['started'] = False
+
+
+def _exclusive_tracing():
+    """Generation number when this is the only profiled run, else None"""
+    with _tracing_lock:
+        return _tracing['generation'] if _tracing['users'] == 1 else None
+
+
+class Span:
+    """A timed stage; memory is only traced while profiling is enabled"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler._stack
+        self.depth = len(stack)
+        self.order = self.profiler._opened
+        self.profiler._opened += 1
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, peak)
+        # Resetting the peak would corrupt the spans of other profiled sessions
+        self.generation = _exclusive_tracing()
+        if self.generation is not None:
+            tracemalloc.reset_peak()
+        self.start_memory = self.peak = current
+        stack.append(self)
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.thread_time() - self.start_cpu
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        exclusive = self.generation is not None and _exclusive_tracing() == self.generation
+
+        stack = self.profiler._stack
+        stack.pop()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, self.peak)
+
+        self.profiler.records.append({
+            'span': self.name,
+            'order': self.order,
+            'depth': self.depth,
+            'wall_ms': wall * 1000,
+            'cpu_ms': cpu * 1000,
+            'alloc_kb': (current - self.start_memory) / 1024,
+            'peak_kb': (self.peak - self.start_memory) / 1024 if exclusive else None,
+            'error': exc_type.__name__ if exc_type else None,
+        })
+        return False
+
+
+class Profiler:
+    def __init__(self, app, enabled=False, log_path=None):
+        self.app = app
+        self.enabled = enabled
+        self.log_path = log_path
+        self.run_id = uuid.uuid4().hex[:8]
+        self.records = []
+        self._stack = []
+        self._opened = 0
+        self._release_tracing = None
+        if enabled:
+            _acquire_tracing()
+            # Runs Streamlit stops early never call finish(); release tracing when they are collected
+            self._release_tracing = weakref.finalize(self, _release_tracing)
+
+    def span(self, name):
+        """Context manager timing one stage; a shared no-op when profiling is off"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name)
+
+    def profiled(self, name=None):
+        """Decorator version of span()"""
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def finish(self):
+        """Release tracing, write the JSONL log and draw the sidebar panel; call once at the end of the script"""
+        if not self.enabled:
+            return
+        self._release_tracing()
+
+        # Spans are recorded when they close; show them in the order they opened
+        records = sorted(self.records, key=lambda r: r['order'])
+
+        if self.log_path:
+            timestamp = datetime.now().isoformat()
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps({'app': self.app, 'run_id': self.run_id,
+                                        'timestamp': timestamp, **record}) + "\n")
+
+        with st.sidebar.expander("⏱️ Profiling", expanded=True):
+            if not records:
+                st.caption("No stages ran")
+                return
+            st.caption(f"Run {self.run_id}")
+            st.dataframe(
+                [{'stage': " " * r['depth'] + r['span'],
+                  'wall ms': round(r['wall_ms'], 1),
+                  'cpu ms': round(r['cpu_ms'], 1),
+                  'alloc KB': round(r['alloc_kb']),
+                  'peak KB': None if r['peak_kb'] is None else round(r['peak_kb'])} for r in records],
+                hide_index=True,
+            )
+
+
+def start_profiler(app):
+    """Profiler for this script run, enabled by MAPS_PROFILE or the sidebar toggle"""
+    forced = os.environ.get("MAPS_PROFILE", "") not in ("", "0")
+    enabled = forced or st.sidebar.toggle("⏱️ Profile this run", key="profile_run")
+    return Profiler(app, enabled=enabled, log_path=os.environ.get("MAPS_PROFILE_LOG"))
@@ -0,0 +1,335 @@
+"""
+Small-multiples choropleths: several metrics side by side over one geometry.
+
+Instead of one Folium map per metric, each with its own copy of every polygon,
+the page embeds the geometry once as a quantized topology. Coordinates are
+snapped to an integer grid and rings are cut into arcs where neighbouring
+polygons meet, so a shared border is stored once and referenced by both sides
+(as in TopoJSON). Each panel only carries a value and a colour class per
+feature, so page weight grows with metrics x features rather than
+metrics x vertices.
+
+Usage:
+    python maps/small_multiples.py <arcgis.geojson> <localidades.csv> [--metrics listing_count,rent_entire_place]
+"""
+import argparse
+import json
+import math
+import sys
+from html import escape
+from pathlib import Path
+
+import pandas as pd
+
+from choropleth import COLOR_SCHEMES, MISSING_COLOR, build_color_scale, classify, clean_value, esri_features_frame
+
+QUANTIZATION = 10_000
+DEFAULT_METRICS = ['listing_count', 'rent_entire_place', 'rent_private_room', 'rent_min_stay_30_nights']
+LEAFLET_JS = "https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js"
+LEAFLET_CSS = "https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css"
+TILES = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+
+
+# ---------- topology ----------
+
+def _quantize_ring(ring, x0, y0, kx, ky):
+    """Ring on the integer grid, without repeated points and without the closing point"""
+    points = []
+    for coord in ring:
+        point = (round((coord[0] - x0) / kx), round((coord[1] - y0) / ky))
+        if not points or point != points[-1]:
+            points.append(point)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+
+def build_topology(features_rings, quantization=QUANTIZATION):
+    """
+    Shared, quantized topology for a list of polygons.
+
+    Args:
+        features_rings (list): Per feature, its rings as [[x, y], ...] (esri 'rings')
+        quantization (int): Grid size along each axis
+
+    Returns:
+        dict: 'transform' (scale, translate), 'arcs' (delta-encoded integer points) and
+              'features' (per feature, its rings as lists of arc ids; ~id means reversed)
+    """
+    coords = [c for rings in features_rings for ring in rings for c in ring]
+    if not coords:
+        return {'transform': {'scale': [1, 1], 'translate': [0, 0]}, 'arcs': [], 'features': [[] for _ in features_rings]}
+    x0, y0 = min(c[0] for c in coords), min(c[1] for c in coords)
+    x1, y1 = max(c[0] for c in coords), max(c[1] for c in coords)
+    kx = (x1 - x0) / (quantization - 1) or 1
+    ky = (y1 - y0) / (quantization - 1) or 1
+
+    rings = []  # (feature, points)
+    for feature, feature_rings in enumerate(features_rings):
+        for ring in feature_rings:
+            points = _quantize_ring(ring, x0, y0, kx, ky)
+            if len(points) >= 3:
+                rings.append((feature, points))
+
+    # Rings passing through each point; an arc ends wherever that set changes
+    owners = {}
+    for ring_id, (_, points) in enumerate(rings):
+        for point in points:
+            owners.setdefault(point, set()).add(ring_id)
+
+    arcs, arc_ids = [], {}
+
+    def arc_index(points):
+        key = tuple(points)
+        if key in arc_ids:
+            return arc_ids[key]
+        if key[::-1] in arc_ids:
+            return ~arc_ids[key[::-1]]
+        arc_ids[key] = len(arcs)
+        arcs.append(key)
+        return arc_ids[key]
+
+    features = [[] for _ in features_rings]
+    for feature, points in rings:
+        n = len(points)
+        cuts = [i for i in range(n)
+                if owners[points[i]] != owners[points[i - 1]] or owners[points[i]] != owners[points[(i + 1) % n]]]
+        if not cuts:
+            # Not touching anything else: one closed arc, starting at its smallest point so duplicates match
+            first = min(range(n), key=points.__getitem__)
+            features[feature].append([arc_index(points[first:] + points[:first] + [points[first]])])
+            continue
+        ring_arcs = []
+        for k, start in enumerate(cuts):
+            end = cuts[(k + 1) % len(cuts)]
+            if end > start:
+                segment = points[start:end + 1]
+            else:
+                segment = points[start:] + points[:end + 1]
+            ring_arcs.append(arc_index(segment))
+        features[feature].append(ring_arcs)
+
+    encoded = []
+    for arc in arcs:
+        previous = (0, 0)
+        deltas = []
+        for point in arc:
+            deltas.append([point[0] - previous[0], point[1] - previous[1]])
+            previous = point
+        encoded.append(deltas)
+
+    return {'transform': {'scale': [kx, ky], 'translate': [x0, y0]}, 'arcs': encoded, 'features': features}
+
+
+# ---------- panels ----------
+
+def _json_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return round(float(value), 2)
+
+
+def metric_panel(values, metric, color_palette, num_classes=5, classification_method="Quantiles (Equal Count)"):
+    """
+    Colour classes of one metric: a class index per feature (-1 when missing) plus the legend.
+
+    Uses the same breaks as the single-map view (choropleth.classify).
+    """
+    values = pd.to_numeric(values, errors='coerce')
+    valid = values.dropna()
+    if valid.empty:
+        return {'metric': metric, 'values': [None] * len(values), 'classes': [-1] * len(values),
+                'colors': [], 'legend': []}
+    breaks = classify(valid, classification_method, num_classes)
+    colors = build_color_scale(color_palette, max(1, len(breaks) - 1))
+
+    classes = []
+    for value in values:
+        if pd.isna(value):
+            classes.append(-1)
+            continue
+        index = len(colors) - 1
+        for i in range(len(breaks) - 1):
+            if breaks[i] <= value <= breaks[i + 1]:
+                index = i
+                break
+        classes.append(index)
+
+    legend = []
+    for i, color in enumerate(colors):
+        upper = breaks[i + 1] if i + 1 < len(breaks) else breaks[-1]
+        legend.append({'color': color, 'range': f"{breaks[i]:,.0f} - {upper:,.0f}", 'count': classes.count(i)})
+    return {'metric': metric, 'values': [_json_value(v) for v in values], 'classes': classes,
+            'colors': colors, 'legend': legend}
+
+
+def _script_json(data):
+    """JSON safe to embed in a <script> block"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).replace("</", "<\\/")
+
+
+# Decodes build_topology() output into Leaflet [lat, lng] rings, one list per feature
+DECODE_TOPOLOGY_JS = """
+function decodeTopology(topology) {
+  const [kx, ky] = topology.transform.scale, [tx, ty] = topology.transform.translate;
+  const arcs = topology.arcs.map(arc => {
+    let x = 0, y = 0;
+    return arc.map(([dx, dy]) => { x += dx; y += dy; return [y * ky + ty, x * kx + tx]; });
+  });
+  return topology.features.map(rings => rings.map(ids => {
+    const ring = [];
+    ids.forEach((id, k) => {
+      const points = id < 0 ? arcs[~id].slice().reverse() : arcs[id];
+      (k ? points.slice(1) : points).forEach(p => ring.push(p));
+    });
+    return ring;
+  }));
+}
+"""
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<link rel="stylesheet" href="__LEAFLET_CSS__">
+<script src="__LEAFLET_JS__"></script>
+<style>
+  body { font-family: Arial, sans-serif; margin: 8px; }
+  .grid { display: grid; grid-template-columns: repeat(__COLUMNS__, 1fr); gap: 12px; }
+  .panel h4 { margin: 4px 0; }
+  .map { height: __HEIGHT__px; border: 1px solid #ccc; }
+  .legend span { display: inline-block; padding: 2px 6px; margin: 2px 2px 0 0; font-size: 11px; border: 1px solid #ccc; }
+</style>
+</head>
+<body>
+<div class="grid" id="panels"></div>
+<script>
+const topology = __TOPOLOGY__;
+const names = __NAMES__;
+const panels = __PANELS__;
+const missingColor = __MISSING__;
+
+__DECODE_TOPOLOGY__
+const shapes = decodeTopology(topology);
+const bounds = L.latLngBounds(shapes.flat(2));
+
+// Names come from the uploaded data: show them as text, never as HTML
+function textTooltip(text) {
+  const span = document.createElement('span');
+  span.textContent = text;
+  return span;
+}
+
+const maps = [];
+let syncing = false;
+panels.forEach((panel, p) => {
+  const div = document.createElement('div');
+  div.className = 'panel';
+  div.innerHTML = '<h4></h4><div class="map" id="map' + p + '"></div><div class="legend"></div>';
+  div.querySelector('h4').textContent = panel.metric;
+  div.querySelector('.legend').innerHTML = panel.legend.map(item =>
+    '<span style="background:' + item.color + '">' + item.range + ' (' + item.count + ')</span>').join('');
+  document.getElementById('panels').appendChild(div);
+
+  const map = L.map('map' + p, {zoomSnap: 0.25});
+  L.tileLayer(__TILES__, {attribution: '&copy; OpenStreetMap contributors', opacity: 0.5}).addTo(map);
+  shapes.forEach((shape, i) => {
+    if (!shape.length) return;
+    const cls = panel.classes[i];
+    const value = panel.values[i];
+    L.polygon(shape, {color: '#000000', weight: 1, fillOpacity: 0.7,
+                      fillColor: cls < 0 ? missingColor : panel.colors[cls]})
+      .bindTooltip(textTooltip(names[i] + ': ' + (value === null ? 'N/A' : value.toLocaleString())))
+      .addTo(map);
+  });
+  map.fitBounds(bounds);
+  // Pan and zoom every panel together
+  map.on('move', () => {
+    if (syncing) return;
+    syncing = true;
+    maps.forEach(other => { if (other !== map) other.setView(map.getCenter(), map.getZoom(), {animate: false}); });
+    syncing = false;
+  });
+  maps.push(map);
+});
+</script>
+</body>
+</html>
+"""
+
+
+def small_multiples_html(topology, names, panels, columns=3, height=350, title="Small multiples"):
+    """Self-contained page with one synced Leaflet map per panel over the shared topology"""
+    replacements = {
+        '__TITLE__': escape(title),
+        '__LEAFLET_CSS__': LEAFLET_CSS,
+        '__LEAFLET_JS__': LEAFLET_JS,
+        '__COLUMNS__': str(columns),
+        '__HEIGHT__': str(height),
+        '__DECODE_TOPOLOGY__': DECODE_TOPOLOGY_JS.strip(),
+        '__TOPOLOGY__': _script_json(topology),
+        '__NAMES__': _script_json([str(name) for name in names]),
+        '__PANELS__': _script_json(panels),
+        '__MISSING__': _script_json(MISSING_COLOR),
+        '__TILES__': _script_json(TILES),
+    }
+    page = PAGE_TEMPLATE
+    for placeholder, value in replacements.items():
+        page = page.replace(placeholder, value)
+    return page
+
+
+def small_multiples_for(merged_df, metrics, name_col, scheme=None, num_classes=5,
+                        classification_method="Quantiles (Equal Count)", columns=3, height=350):
+    """
+    Page for rows of a matched frame (esri 'geometry_raw' plus metric columns), one panel per metric.
+
+    Returns:
+        str: HTML page
+    """
+    palette = COLOR_SCHEMES[scheme or next(iter(COLOR_SCHEMES))]
+    rings = [(geometry or {}).get('rings', []) for geometry in merged_df['geometry_raw']]
+    topology = build_topology(rings)
+    panels = [metric_panel(merged_df[metric], metric, palette, num_classes, classification_method)
+              for metric in metrics]
+    return small_multiples_html(topology, merged_df[name_col].tolist(), panels, columns, height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render several localidad metrics side by side")
+    parser.add_argument("geojson", type=Path, help="ArcGIS GeoJSON with the polygons")
+    parser.add_argument("csv", type=Path, help="CSV with one row per localidad, e.g. maps/localidades.csv")
+    parser.add_argument("--metrics", default=",".join(DEFAULT_METRICS), help="Comma-separated CSV columns")
+    parser.add_argument("--csv-col", default="LocNombre", help="CSV column with the location name")
+    parser.add_argument("--geo-col", default="LocNombre", help="GeoJSON attribute with the location name")
+    parser.add_argument("--scheme", default=next(iter(COLOR_SCHEMES)), choices=list(COLOR_SCHEMES))
+    parser.add_argument("--classes", type=int, default=5)
+    parser.add_argument("--columns", type=int, default=2, help="Panels per row")
+    parser.add_argument("--output", type=Path, default=Path("small_multiples.html"))
+    args = parser.parse_args()
+
+    with open(args.geojson, 'r', encoding='utf-8') as f:
+        features_df = esri_features_frame(json.load(f))
+    df = pd.read_csv(args.csv)
+    metrics = [m for m in args.metrics.split(",") if m]
+    missing = [m for m in metrics if m not in df.columns]
+    if missing:
+        parser.error(f"Columns not in {args.csv}: {missing}")
+
+    df['match_key'] = df[args.csv_col].apply(clean_value)
+    features_df['match_key'] = features_df[args.geo_col].apply(clean_value)
+    merged_df = features_df.merge(df, on='match_key', how='inner', suffixes=('_geo', '_csv'))
+    if merged_df.empty:
+        print("❌ No matches found!")
+        sys.exit(1)
+
+    name_col = f"{args.geo_col}_geo" if f"{args.geo_col}_geo" in merged_df.columns else args.geo_col
+    page = small_multiples_for(merged_df, metrics, name_col, args.scheme, args.classes, columns=args.columns)
+    args.output.write_text(page, encoding='utf-8')
+    print(f"✅ {len(metrics)} metrics x {len(merged_df)} localidades saved to {args.output} "
+          f"({len(page.encode('utf-8')) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
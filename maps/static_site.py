@@ -0,0 +1,360 @@
+"""
+Pre-rendered static choropleth site: one page per metric and classification method.
+
+Most viewers never touch the controls in app2.py, yet each of them costs a
+Streamlit session that parses, merges and renders the same maps again. This
+renders every metric x classification method combination ahead of time:
+
+    site/
+        index.html
+        geometry.<hash>.json      quantized topology + names, shared by all pages
+        <metric>/<method>.html    values, colour classes and legend only
+        site_manifest.json        geometry and pages of the last build
+
+The geometry file name changes with its content, so it can be cached forever.
+A rebuild writes the new geometry and pages first and only then deletes what
+the previous build's manifest lists and this one no longer has, so deployed
+pages never point at a missing file and nothing else in the folder is touched.
+Colour schemes are switched in the browser (the choice is kept in the URL hash
+when moving between pages) because they only change colours, not classes.
+Pages are rendered in parallel worker processes. Serve the folder with any
+static file server, e.g. `python -m http.server -d site`; pages fetch the
+geometry, so they do not work from file://.
+
+Usage:
+    python maps/static_site.py <arcgis.geojson> [airdna/cleaned/localidades.csv] [--output site]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from pathlib import Path
+
+import pandas as pd
+
+from choropleth import CLASSIFICATION_METHODS, COLOR_SCHEMES, MISSING_COLOR, build_color_scale, esri_features_frame
+from small_multiples import (DECODE_TOPOLOGY_JS, LEAFLET_CSS, LEAFLET_JS, TILES, _script_json, build_topology,
+                             metric_panel)
+
+REPO_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_CSV = REPO_DIR / "airdna" / "cleaned" / "localidades.csv"
+DEFAULT_OUTPUT = REPO_DIR / "site"
+MANIFEST_NAME = "site_manifest.json"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<link rel="stylesheet" href="__LEAFLET_CSS__">
+<script src="__LEAFLET_JS__"></script>
+<style>
+  body { font-family: Arial, sans-serif; margin: 8px; }
+  .controls { margin-bottom: 8px; }
+  .controls label { margin-right: 12px; }
+  #map { height: 80vh; border: 1px solid #ccc; }
+  .legend span { display: inline-block; padding: 2px 6px; margin: 4px 2px 0 0; font-size: 12px; border: 1px solid #ccc; }
+</style>
+</head>
+<body>
+<div class="controls">
+  <a href="../index.html">All maps</a> |
+  <label>Metric <select id="metric"></select></label>
+  <label>Classification <select id="method"></select></label>
+  <label>Colours <select id="scheme"></select></label>
+</div>
+<div id="map"></div>
+<div class="legend" id="legend"></div>
+<script>
+const page = __PAGE__;
+const missingColor = __MISSING__;
+__DECODE_TOPOLOGY__
+
+const schemeNames = Object.keys(page.schemes);
+let scheme = decodeURIComponent(location.hash.slice(1));
+if (!page.schemes[scheme]) scheme = schemeNames[0];
+
+function fillSelect(id, options, selected, onChange) {
+  const select = document.getElementById(id);
+  options.forEach(([value, label]) => select.add(new Option(label, value, false, value === selected)));
+  select.onchange = () => onChange(select.value);
+}
+const go = (metric, method) => { location.href = '../' + metric + '/' + method + '.html#' + encodeURIComponent(scheme); };
+fillSelect('metric', page.metrics, page.metric_slug, value => go(value, page.method_slug));
+fillSelect('method', page.methods, page.method_slug, value => go(page.metric_slug, value));
+fillSelect('scheme', schemeNames.map(name => [name, name]), scheme, value => { scheme = value; recolor(); });
+
+const map = L.map('map', {zoomSnap: 0.25, preferCanvas: true});
+L.tileLayer(__TILES__, {attribution: '&copy; OpenStreetMap contributors', opacity: 0.5}).addTo(map);
+const layers = [];
+
+function recolor() {
+  const colors = page.schemes[scheme];
+  layers.forEach(([layer, cls]) => layer.setStyle({fillColor: cls < 0 ? missingColor : colors[cls]}));
+  document.getElementById('legend').innerHTML = page.legend.map((item, i) =>
+    '<span style="background:' + colors[i] + '">' + item.range + ' (' + item.count + ')</span>').join('');
+  history.replaceState(null, '', '#' + encodeURIComponent(scheme));
+}
+
+// Names come from the polygon layer: show them as text, never as HTML
+function textTooltip(text) {
+  const span = document.createElement('span');
+  span.textContent = text;
+  return span;
+}
+
+fetch('../' + page.geometry).then(response => response.json()).then(geometry => {
+  const shapes = decodeTopology(geometry.topology);
+  shapes.forEach((shape, i) => {
+    if (!shape.length) return;
+    const value = page.values[i];
+    const layer = L.polygon(shape, {color: '#000000', weight: 1, fillOpacity: 0.7})
+      .bindTooltip(textTooltip(geometry.names[i] + ': ' + (value === null ? 'N/A' : value.toLocaleString())))
+      .addTo(map);
+    layers.push([layer, page.classes[i]]);
+  });
+  map.fitBounds(L.latLngBounds(shapes.flat(2)));
+  recolor();
+});
+</script>
+</body>
+</html>
+"""
+
+
+def slugify(text):
+    """'Quantiles (Equal Count)' -> 'quantiles', 'rent_entire_place' -> 'rent_entire_place'"""
+    text = text.split('(')[0].strip().lower()
+    return re.sub(r'[^a-z0-9_]+', '-', text).strip('-')
+
+
+def unique_slugs(names, kind):
+    """
+    Slug of every name, refusing names whose pages would overwrite each other.
+
+    Raises:
+        ValueError: Two names share a slug, or a name has none
+    """
+    slugs = {}
+    for name in names:
+        slug = slugify(name)
+        if not slug:
+            raise ValueError(f"{kind} {name!r} has no usable characters for a page name")
+        if slug in slugs:
+            raise ValueError(f"{kind} {slugs[slug]!r} and {name!r} would both be written as '{slug}'")
+        slugs[slug] = name
+    return list(slugs)
+
+
+def match_key(value):
+    """Location name without accents, case or surrounding spaces: 'ANTONIO NARIÑO' == 'Antonio Narino'"""
+    if pd.isna(value):
+        return ""
+    decomposed = unicodedata.normalize('NFKD', str(value).strip())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def write_atomic(path, text):
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text, encoding='utf-8')
+    tmp.replace(path)
+
+
+def render_page(job):
+    """
+    Classify one metric with one method and write its page (runs in a worker process).
+
+    Args:
+        job (dict): metric, method, values, num_classes, geometry file name, navigation lists and output path
+
+    Returns:
+        tuple: (page path, size in bytes)
+    """
+    palette = COLOR_SCHEMES[next(iter(COLOR_SCHEMES))]
+    panel = metric_panel(pd.Series(job['values'], dtype='float64'), job['metric'], palette,
+                         job['num_classes'], job['method'])
+    page = {
+        'metric_slug': slugify(job['metric']),
+        'method_slug': slugify(job['method']),
+        'metrics': job['metrics'],
+        'methods': job['methods'],
+        'geometry': job['geometry'],
+        'values': panel['values'],
+        'classes': panel['classes'],
+        'legend': [{'range': item['range'], 'count': item['count']} for item in panel['legend']],
+        'schemes': {name: build_color_scale(colors, len(panel['colors'])) for name, colors in COLOR_SCHEMES.items()},
+    }
+    replacements = {
+        '__TITLE__': escape(f"{job['metric']} - {job['method']}"),
+        '__LEAFLET_CSS__': LEAFLET_CSS,
+        '__LEAFLET_JS__': LEAFLET_JS,
+        '__PAGE__': _script_json(page),
+        '__MISSING__': _script_json(MISSING_COLOR),
+        '__DECODE_TOPOLOGY__': DECODE_TOPOLOGY_JS.strip(),
+        '__TILES__': _script_json(TILES),
+    }
+    html = PAGE_TEMPLATE
+    for placeholder, value in replacements.items():
+        html = html.replace(placeholder, value)
+    path = Path(job['path'])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, html)
+    return str(path), len(html.encode('utf-8'))
+
+
+def write_geometry(merged_df, name_col, output_dir):
+    """Write the shared topology and names as 'geometry.<content hash>.json'; returns the file name"""
+    rings = [(geometry or {}).get('rings', []) for geometry in merged_df['geometry_raw']]
+    data = json.dumps({'topology': build_topology(rings), 'names': [str(n) for n in merged_df[name_col]]},
+                      separators=(',', ':'), ensure_ascii=False)
+    name = f"geometry.{hashlib.sha1(data.encode('utf-8')).hexdigest()[:12]}.json"
+    write_atomic(output_dir / name, data)
+    return name
+
+
+def read_manifest(output_dir):
+    """Geometry file and pages of the previous build, or None"""
+    path = output_dir / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def remove_previous_build(output_dir, previous, geometry, pages):
+    """Delete the files the previous build listed that this build did not write"""
+    if not previous:
+        return
+    if previous.get('geometry') not in (None, geometry):
+        (output_dir / previous['geometry']).unlink(missing_ok=True)
+    for page in set(previous.get('pages', [])) - set(pages):
+        path = output_dir / page
+        path.unlink(missing_ok=True)
+        # Only the metric folders this site created, once they are empty
+        if path.parent != output_dir and path.parent.exists() and not any(path.parent.iterdir()):
+            path.parent.rmdir()
+
+
+def write_index(output_dir, metrics, methods, count):
+    """Landing page linking every metric/method page"""
+    rows = []
+    for metric in metrics:
+        links = " | ".join(f'<a href="{slugify(metric)}/{slugify(method)}.html">{escape(method)}</a>'
+                           for method in methods)
+        rows.append(f"<tr><td>{escape(metric)}</td><td>{links}</td></tr>")
+    html = (f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>Localidad maps</title></head>\n'
+            f'<body style="font-family: Arial, sans-serif;">\n<h2>Localidad maps</h2>\n'
+            f'<p>{count} localidades, {len(metrics)} metrics x {len(methods)} classification methods.</p>\n'
+            f'<table cellpadding="4">\n{chr(10).join(rows)}\n</table>\n</body>\n</html>\n')
+    write_atomic(output_dir / "index.html", html)
+
+
+def build_site(merged_df, name_col, metrics, output_dir=DEFAULT_OUTPUT, methods=CLASSIFICATION_METHODS,
+               num_classes=5, max_workers=None):
+    """
+    Render every metric x method page for a matched frame (esri 'geometry_raw' plus metric columns).
+
+    Args:
+        merged_df (pandas.DataFrame): One row per polygon
+        name_col (str): Column with the polygon names shown in tooltips
+        metrics (list): Numeric columns to map
+        max_workers (int): Worker processes. Defaults to the number of cores.
+
+    Returns:
+        list: (page path, size in bytes) for every page written
+
+    Raises:
+        ValueError: No metrics or methods, or two of them with the same page name
+    """
+    if not metrics or not methods:
+        raise ValueError("Nothing to render: no metrics or no classification methods")
+    metric_slugs = unique_slugs(metrics, "Metric")
+    method_slugs = unique_slugs(methods, "Method")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    previous = read_manifest(output_dir)
+    geometry = write_geometry(merged_df, name_col, output_dir)
+    navigation = {
+        'metrics': [list(item) for item in zip(metric_slugs, metrics)],
+        'methods': [list(item) for item in zip(method_slugs, methods)],
+    }
+    jobs = []
+    for metric, metric_slug in zip(metrics, metric_slugs):
+        values = pd.to_numeric(merged_df[metric], errors='coerce').tolist()
+        for method, method_slug in zip(methods, method_slugs):
+            jobs.append({
+                'metric': metric, 'method': method, 'values': values, 'num_classes': num_classes,
+                'geometry': geometry, **navigation,
+                'path': str(output_dir / metric_slug / f"{method_slug}.html"),
+            })
+
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(jobs), os.cpu_count() or 1)) as executor:
+        pages = list(executor.map(render_page, jobs))
+    write_index(output_dir, metrics, methods, len(merged_df))
+
+    # Everything new is in place; only now drop what the previous build left behind
+    page_names = [Path(path).relative_to(output_dir).as_posix() for path, _ in pages]
+    remove_previous_build(output_dir, previous, geometry, page_names)
+    write_atomic(output_dir / MANIFEST_NAME, json.dumps({'geometry': geometry, 'pages': page_names}, indent=2))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a static site with every localidad metric map")
+    parser.add_argument("geojson", type=Path, help="ArcGIS GeoJSON with the polygons")
+    parser.add_argument("csv", type=Path, nargs="?", default=DEFAULT_CSV, help="CSV with one row per localidad")
+    parser.add_argument("--metrics", help="Comma-separated CSV columns. Defaults to every numeric column but 'id'.")
+    parser.add_argument("--csv-col", default="name", help="CSV column with the location name")
+    parser.add_argument("--geo-col", default="LocNombre", help="GeoJSON attribute with the location name")
+    parser.add_argument("--classes", type=int, default=5)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: number of cores)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.geojson, 'r', encoding='utf-8') as f:
+        features_df = esri_features_frame(json.load(f))
+    df = pd.read_csv(args.csv)
+    if args.metrics:
+        metrics = [m for m in args.metrics.split(",") if m]
+    else:
+        metrics = [c for c in df.select_dtypes('number').columns if c != 'id']
+    if not metrics:
+        parser.error(f"No metrics to render in {args.csv}")
+    missing = [m for m in metrics + [args.csv_col] if m not in df.columns]
+    if missing:
+        parser.error(f"Columns not in {args.csv}: {missing}")
+    try:
+        unique_slugs(metrics, "Metric")
+    except ValueError as e:
+        parser.error(str(e))
+
+    df['match_key'] = df[args.csv_col].apply(match_key)
+    features_df['match_key'] = features_df[args.geo_col].apply(match_key)
+    merged_df = features_df.merge(df, on='match_key', how='inner', suffixes=('_geo', '_csv'))
+    if merged_df.empty:
+        print("❌ No matches found!")
+        sys.exit(1)
+    unmatched = features_df.loc[~features_df['match_key'].isin(df['match_key']), args.geo_col].tolist()
+    if unmatched:
+        print(f"⚠️ {len(unmatched)} polygons without a CSV row: {unmatched}")
+
+    name_col = f"{args.geo_col}_geo" if f"{args.geo_col}_geo" in merged_df.columns else args.geo_col
+    pages = build_site(merged_df, name_col, metrics, args.output, num_classes=args.classes,
+                       max_workers=args.workers)
+    total = sum(size for _, size in pages)
+    print(f"✅ {len(pages)} pages ({len(metrics)} metrics x {len(CLASSIFICATION_METHODS)} methods) "
+          f"for {len(merged_df)} localidades in {time.perf_counter() - start:.1f}s -> {args.output}")
+    geometry = Path(args.output) / read_manifest(Path(args.output))['geometry']
+    print(f"   {total / len(pages) / 1024:.1f} KB per page + {geometry.stat().st_size / 1024:.0f} KB shared geometry")
+
+
+if __name__ == "__main__":
+    main()
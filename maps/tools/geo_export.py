@@ -0,0 +1,214 @@
+"""
+Spatially indexed exports of listings and polygons for GIS tools and bbox reads.
+
+Writes each layer twice:
+- FlatGeobuf with a packed Hilbert R-tree, which QGIS, GDAL and fgb readers
+  use to read only the features in the current view.
+- GeoParquet with a 'bbox' covering column (GeoParquet 1.1). Rows are sorted
+  along a Hilbert curve and written in small row groups, so a bbox filter skips
+  every row group outside the query.
+
+Listings are points from 'lat'/'lng' in 'airdna/cleaned/listings/*.csv'.
+Polygons come from ArcGIS GeoJSON ('rings', like the map apps use), the output of
+converter.py (esri geometries in a FeatureCollection) or standard GeoJSON,
+e.g. localidades or UPZ layers.
+
+Usage:
+    python maps/tools/geo_export.py export [--polygons localidades.geojson upz.geojson] [--output-dir DIR]
+    python maps/tools/geo_export.py query <file.parquet|file.fgb> <minx> <miny> <maxx> <maxy>
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import LineString, MultiLineString, MultiPolygon, Point, Polygon, shape
+
+REPO_DIR = Path(__file__).resolve().parents[2]
+CLEANED_DIR = REPO_DIR / "airdna" / "cleaned"
+EXPORT_DIR = CLEANED_DIR / "geo"
+CRS = "EPSG:4326"
+ROW_GROUP_SIZE = 2048
+
+# schema.py lives in airdna/
+sys.path.append(str(REPO_DIR / "airdna"))
+
+
+def listings_frame(cleaned_dir=CLEANED_DIR):
+    """All cleaned listings as points; rows without coordinates are dropped"""
+    from schema import read_listings_csv
+
+    paths = sorted((Path(cleaned_dir) / "listings").glob("*.csv"))
+    # float64 like every other file written from the listings
+    df = pd.concat([read_listings_csv(path, compact_floats=False) for path in paths], ignore_index=True)
+    df = df.dropna(subset=['lat', 'lng'])
+    return gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df['lng'], df['lat']), crs=CRS)
+
+
+def _signed_area(ring):
+    return sum(x0 * y1 - x1 * y0 for (x0, y0, *_), (x1, y1, *_) in zip(ring, ring[1:] + ring[:1])) / 2
+
+
+def esri_polygon(rings):
+    """
+    Shapely geometry of esri polygon rings.
+
+    Clockwise rings are shells and counter-clockwise ones are holes of the shell
+    that contains them. If every ring turns the same way, each one is a shell.
+    """
+    rings = [[tuple(c[:2]) for c in ring] for ring in rings if len(ring) >= 4]
+    if not rings:
+        return None
+    shells = [r for r in rings if _signed_area(r) < 0]
+    holes = [r for r in rings if _signed_area(r) >= 0]
+    if not shells:
+        shells, holes = holes, []
+    shell_polygons = [Polygon(shell) for shell in shells]
+    shell_holes = [[] for _ in shells]
+    for hole in holes:
+        point = Point(hole[0])
+        for i, polygon in enumerate(shell_polygons):
+            if polygon.contains(point):
+                shell_holes[i].append(hole)
+                break
+    parts = [Polygon(shell, hs) for shell, hs in zip(shells, shell_holes)]
+    return parts[0] if len(parts) == 1 else MultiPolygon(parts)
+
+
+def esri_paths(paths):
+    """Shapely geometry of esri polyline paths"""
+    lines = [[tuple(c[:2]) for c in path] for path in paths if len(path) >= 2]
+    if not lines:
+        return None
+    return LineString(lines[0]) if len(lines) == 1 else MultiLineString(lines)
+
+
+def feature_geometry(geometry):
+    """
+    Shapely geometry of a feature in either format.
+
+    converter.py wraps ArcGIS features in a FeatureCollection but keeps their
+    esri geometry, so 'rings'/'paths' are checked per feature before GeoJSON 'type'.
+    """
+    if not geometry:
+        return None
+    if 'rings' in geometry:
+        return esri_polygon(geometry['rings'])
+    if 'paths' in geometry:
+        return esri_paths(geometry['paths'])
+    if 'x' in geometry and 'y' in geometry:
+        return Point(geometry['x'], geometry['y'])
+    if geometry.get('type'):
+        return shape(geometry)
+    return None
+
+
+def polygons_frame(geojson_path):
+    """
+    Polygons with their attributes from a GeoJSON file.
+
+    Accepts ArcGIS JSON ('attributes'/'rings'), standard GeoJSON, and
+    FeatureCollections holding esri geometries (the output of converter.py).
+    """
+    with open(geojson_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    features = data.get('features', [])
+    rows = [feature.get('properties') or feature.get('attributes') or {} for feature in features]
+    geometries = [feature_geometry(feature.get('geometry')) for feature in features]
+    return gpd.GeoDataFrame(rows, geometry=geometries, crs=CRS)
+
+
+def _hilbert_sorted(gdf):
+    """Rows in Hilbert-curve order so nearby features end up in the same row groups and R-tree nodes"""
+    gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+    return gdf.iloc[gdf.hilbert_distance().argsort()].reset_index(drop=True)
+
+
+def write_geoparquet(gdf, path, row_group_size=ROW_GROUP_SIZE):
+    """GeoParquet with a bbox covering column, Hilbert-sorted in small row groups"""
+    _hilbert_sorted(gdf).to_parquet(path, write_covering_bbox=True, row_group_size=row_group_size,
+                                    schema_version='1.1.0')
+
+
+def write_flatgeobuf(gdf, path):
+    """FlatGeobuf with a packed Hilbert R-tree"""
+    Path(path).unlink(missing_ok=True)
+    _hilbert_sorted(gdf).to_file(path, driver="FlatGeobuf", engine="pyogrio", SPATIAL_INDEX="YES")
+
+
+def export_layer(gdf, name, output_dir=EXPORT_DIR):
+    """Write '<name>.parquet' and '<name>.fgb'; returns their paths"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = output_dir / f"{name}.parquet", output_dir / f"{name}.fgb"
+    write_geoparquet(gdf, paths[0])
+    write_flatgeobuf(gdf, paths[1])
+    sizes = ", ".join(f"{p.name} {p.stat().st_size / 1e6:.1f} MB" for p in paths)
+    print(f"  {name}: {len(gdf)} features -> {sizes}")
+    return paths
+
+
+def read_bbox(path, bbox, columns=None):
+    """
+    Features of an exported layer that intersect bbox, reading only what the spatial index points to.
+
+    Args:
+        path: '.parquet' (GeoParquet with bbox covering) or '.fgb' (FlatGeobuf) file
+        bbox (tuple): (minx, miny, maxx, maxy) in EPSG:4326, i.e. (west, south, east, north)
+        columns (list): Attribute columns to read. Defaults to all.
+
+    Returns:
+        geopandas.GeoDataFrame
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        if columns is not None:
+            columns = list(columns) + ['geometry']
+        gdf = gpd.read_parquet(path, bbox=tuple(bbox), columns=columns)
+        # The covering filter is on feature bboxes; keep only real intersections
+        return gdf[gdf.intersects(_bbox_polygon(bbox))].drop(columns=['bbox'], errors='ignore')
+    if path.suffix == ".fgb":
+        return gpd.read_file(path, bbox=tuple(bbox), columns=columns, engine="pyogrio")
+    raise ValueError(f"Unsupported file type: {path.suffix} (expected .parquet or .fgb)")
+
+
+def _bbox_polygon(bbox):
+    minx, miny, maxx, maxy = bbox
+    return Polygon([(minx, miny), (maxx, miny), (maxx, maxy), (minx, maxy)])
+
+
+def export_all(polygon_files=(), cleaned_dir=CLEANED_DIR, output_dir=EXPORT_DIR):
+    """Export the listings and each polygon file (named after the file)"""
+    start = time.perf_counter()
+    print(f"Exporting to {output_dir}")
+    export_layer(listings_frame(cleaned_dir), "listings", output_dir)
+    for polygon_file in polygon_files:
+        export_layer(polygons_frame(polygon_file), Path(polygon_file).stem, output_dir)
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spatially indexed GeoParquet/FlatGeobuf exports and bbox reads")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write listings and polygon layers")
+    export.add_argument("--polygons", nargs="*", default=[], help="ArcGIS or standard GeoJSON polygon files")
+    export.add_argument("--output-dir", type=Path, default=EXPORT_DIR)
+    query = commands.add_parser("query", help="Read the features in a bounding box")
+    query.add_argument("file", type=Path)
+    query.add_argument("bbox", type=float, nargs=4, metavar=("MINX", "MINY", "MAXX", "MAXY"))
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_all(args.polygons, output_dir=args.output_dir)
+    else:
+        start = time.perf_counter()
+        gdf = read_bbox(args.file, args.bbox)
+        print(gdf.drop(columns='geometry').head(20).to_string())
+        print(f"{len(gdf)} features in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+"""
+Single-pass GeoJSON profiler with bounded memory.
+
+Reads a FeatureCollection in chunks and decodes one feature at a time, so only
+the largest feature has to fit in memory. For every property key it keeps type
+counts, nulls, missing values, string lengths, numeric ranges, an approximate
+distinct count (HyperLogLog) and the most frequent values (Space-Saving). For
+geometries it keeps type counts, vertex, ring, part and hole counts, unclosed
+rings and the overall bbox.
+
+Usage:
+    python maps/tools/geojson_profile.py <file.geojson> [report_name]
+
+Writes '<report_name>.json' and '<report_name>.txt' (default 'geojson_report').
+"""
+import hashlib
+import json
+import math
+import re
+import sys
+import time
+
+import msgspec
+
+CHUNK_SIZE = 1 << 20
+HLL_PRECISION = 12  # 4096 registers, ~1.6% standard error
+TOP_K = 10
+TOP_K_CAPACITY = 200
+SAMPLE_FEATURES = 3
+LOCATION_TERMS = ['name', 'nombre', 'region', 'district', 'boro', 'neigh', 'loc']
+
+# Complete strings, brackets, or a lone quote (a string cut off at the end of the buffer)
+_HEADER_TOKEN = re.compile(rb'"(?:[^"\\]++|\\.)*+"|[{}\[\]]|"', re.S)
+# A feature can only end at a '}' followed by ', {' or the ']' closing the array;
+# a candidate is the real end when the bytes since the feature's '{' decode as JSON
+_FEATURE_END = re.compile(rb'\}\s*(?:,\s*\{|\])')
+_NON_SPACE = re.compile(rb'\S')
+
+
+class Geometry(msgspec.Struct):
+    type: str = ""
+    coordinates: list | None = None
+    geometries: list["Geometry"] | None = None
+
+
+class Feature(msgspec.Struct):
+    properties: dict | None = None
+    geometry: Geometry | None = None
+
+
+_feature_decoder = msgspec.json.Decoder(Feature)
+_raw_decoder = msgspec.json.Decoder(msgspec.Raw)
+
+
+# ---------- streaming ----------
+
+class _Reader:
+    """Chunked reader keeping a window of the file in a bytearray; 'offset' is the file position of buf[0]"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = bytearray()
+        self.offset = 0
+
+    def more(self, keep_from):
+        """Drop buf[:keep_from] and read another chunk; returns how many bytes were dropped, None at EOF"""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return None
+        del self.buf[:keep_from]
+        self.buf += chunk
+        self.offset += keep_from
+        return keep_from
+
+
+def _features_start(reader):
+    """Position in reader.buf just after the '[' of the top-level 'features' array"""
+    pos = 0
+    depth = 0
+    last_string = b""
+    while True:
+        match = _HEADER_TOKEN.search(reader.buf, pos)
+        if match is None or (match.end() - match.start() == 1 and reader.buf[match.start()] == 0x22):
+            resume = match.start() if match is not None else len(reader.buf)
+            dropped = reader.more(resume)
+            if dropped is None:
+                raise ValueError("No top-level 'features' array found")
+            pos = resume - dropped
+            continue
+        token = reader.buf[match.start()]
+        pos = match.end()
+        if token == 0x22:
+            last_string = bytes(reader.buf[match.start() + 1:match.end() - 1])
+        elif token in b"{[":
+            if token == 0x5B and depth == 1 and last_string == b"features":
+                return pos
+            depth += 1
+        else:
+            depth -= 1
+
+
+def iter_features(filepath, chunk_size=CHUNK_SIZE):
+    """
+    Yield the raw bytes of every feature in a FeatureCollection, reading the file in chunks.
+
+    Only the feature being read is kept in memory besides the current chunk.
+
+    Raises:
+        ValueError: If there is no top-level 'features' array or a feature never ends
+    """
+    with open(filepath, 'rb') as f:
+        reader = _Reader(f, chunk_size)
+        start = _features_start(reader)
+        while (first := _NON_SPACE.search(reader.buf, start)) is None:
+            dropped = reader.more(start)
+            if dropped is None:
+                raise ValueError("File ends inside the 'features' array")
+            start -= dropped
+        if reader.buf[first.start()] == 0x5D:  # empty array
+            return
+        start = pos = first.start()
+
+        while True:
+            match = _FEATURE_END.search(reader.buf, pos)
+            if match is None:
+                dropped = reader.more(start)
+                if dropped is None:
+                    raise ValueError(f"Could not find the end of the feature at byte {reader.offset + start}")
+                start -= dropped
+                pos -= dropped
+                continue
+            end = match.start() + 1
+            try:
+                _raw_decoder.decode(reader.buf[start:end])
+            except msgspec.DecodeError:
+                # The '}' closed something inside the feature (or was cut short); look further
+                pos = end
+                continue
+            yield bytes(reader.buf[start:end])
+            if reader.buf[match.end() - 1] == 0x5D:
+                return
+            start = pos = match.end() - 1
+
+
+# ---------- sketches ----------
+
+def _hash64(value):
+    if isinstance(value, str):
+        data = b"s" + value.encode('utf-8')
+    else:
+        data = b"j" + msgspec.json.encode(value)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Approximate distinct count in 2^precision bytes"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return round(estimate)
+
+
+class SpaceSaving:
+    """
+    Most frequent values with a bounded number of counters.
+
+    New values start at the largest count dropped so far, so a reported count
+    overestimates by at most its 'error'. Counters are pruned in batches once
+    there are twice 'capacity' of them, which keeps high-cardinality keys cheap.
+    """
+
+    def __init__(self, capacity=TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+
+    def add(self, value):
+        if value in self.counts:
+            self.counts[value] += 1
+            return
+        self.counts[value] = self.floor + 1
+        self.errors[value] = self.floor
+        if len(self.counts) > 2 * self.capacity:
+            ranked = sorted(self.counts, key=self.counts.get, reverse=True)
+            for dropped in ranked[self.capacity:]:
+                self.floor = max(self.floor, self.counts.pop(dropped))
+                del self.errors[dropped]
+
+    def top(self, k=TOP_K):
+        ranked = sorted(self.counts.items(), key=lambda item: -item[1])[:k]
+        return [{'value': value, 'count': count, 'error': self.errors[value]} for value, count in ranked]
+
+
+# ---------- per-key and geometry stats ----------
+
+class KeyStats:
+    def __init__(self):
+        self.present = 0
+        self.types = {}
+        self.nulls = 0
+        self.padded = 0  # strings with leading/trailing whitespace
+        self.min_length = None
+        self.max_length = None
+        self.min_value = None
+        self.max_value = None
+        self.distinct = HyperLogLog()
+        self.top = SpaceSaving()
+
+    def add(self, value):
+        self.present += 1
+        type_name = 'null' if value is None else type(value).__name__
+        self.types[type_name] = self.types.get(type_name, 0) + 1
+        if value is None:
+            self.nulls += 1
+            return
+        self.distinct.add(value)
+        if isinstance(value, str):
+            if value != value.strip():
+                self.padded += 1
+            length = len(value)
+            self.min_length = length if self.min_length is None else min(self.min_length, length)
+            self.max_length = length if self.max_length is None else max(self.max_length, length)
+            self.top.add(value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            self.min_value = value if self.min_value is None else min(self.min_value, value)
+            self.max_value = value if self.max_value is None else max(self.max_value, value)
+            self.top.add(value)
+        elif isinstance(value, bool):
+            self.top.add(value)
+        else:
+            self.top.add(msgspec.json.encode(value).decode('utf-8'))
+
+    def report(self, features):
+        return {
+            'present': self.present,
+            'missing': features - self.present,
+            'nulls': self.nulls,
+            'types': self.types,
+            'distinct_estimate': self.distinct.count(),
+            'padded_strings': self.padded,
+            'string_length': [self.min_length, self.max_length] if self.min_length is not None else None,
+            'numeric_range': [self.min_value, self.max_value] if self.min_value is not None else None,
+            'top_values': self.top.top(),
+        }
+
+
+def _ring_stats(ring, stats):
+    stats['rings'] += 1
+    stats['vertices'] += len(ring)
+    if len(ring) < 4 or ring[0] != ring[-1]:
+        stats['unclosed_rings'] += 1
+    _extend_bbox(ring, stats)
+
+
+def _extend_bbox(points, stats):
+    bbox = stats['bbox']
+    for point in points:
+        x, y = point[0], point[1]
+        if x < bbox[0]:
+            bbox[0] = x
+        if y < bbox[1]:
+            bbox[1] = y
+        if x > bbox[2]:
+            bbox[2] = x
+        if y > bbox[3]:
+            bbox[3] = y
+
+
+def geometry_counts(geometry, stats):
+    """Add a geometry's vertices, rings, parts and holes to stats (dict of running totals)"""
+    kind = geometry.type
+    coords = geometry.coordinates
+    if kind == 'GeometryCollection':
+        for part in geometry.geometries or []:
+            geometry_counts(part, stats)
+        return
+    if not coords:
+        stats['empty'] += 1
+        return
+    if kind == 'Point':
+        stats['parts'] += 1
+        stats['vertices'] += 1
+        _extend_bbox([coords], stats)
+    elif kind in ('MultiPoint', 'LineString'):
+        stats['parts'] += 1 if kind == 'LineString' else len(coords)
+        stats['vertices'] += len(coords)
+        _extend_bbox(coords, stats)
+    elif kind == 'MultiLineString':
+        for line in coords:
+            stats['parts'] += 1
+            stats['vertices'] += len(line)
+            _extend_bbox(line, stats)
+    elif kind in ('Polygon', 'MultiPolygon'):
+        polygons = [coords] if kind == 'Polygon' else coords
+        for polygon in polygons:
+            stats['parts'] += 1
+            stats['holes'] += max(0, len(polygon) - 1)
+            for ring in polygon:
+                _ring_stats(ring, stats)
+    else:
+        stats['unknown_types'] += 1
+
+
+class GeometryStats:
+    def __init__(self):
+        self.types = {}
+        self.nulls = 0
+        self.totals = {'vertices': 0, 'rings': 0, 'parts': 0, 'holes': 0, 'unclosed_rings': 0,
+                       'empty': 0, 'unknown_types': 0, 'bbox': [math.inf, math.inf, -math.inf, -math.inf]}
+        self.min_vertices = None
+        self.max_vertices = 0
+        self.max_vertices_feature = None
+
+    def add(self, geometry, index):
+        if geometry is None:
+            self.nulls += 1
+            return
+        self.types[geometry.type] = self.types.get(geometry.type, 0) + 1
+        before = self.totals['vertices']
+        geometry_counts(geometry, self.totals)
+        vertices = self.totals['vertices'] - before
+        self.min_vertices = vertices if self.min_vertices is None else min(self.min_vertices, vertices)
+        if vertices > self.max_vertices:
+            self.max_vertices, self.max_vertices_feature = vertices, index
+
+    def report(self, features):
+        with_geometry = features - self.nulls
+        bbox = self.totals['bbox']
+        return {
+            'types': self.types,
+            'nulls': self.nulls,
+            'empty': self.totals['empty'],
+            'unknown_types': self.totals['unknown_types'],
+            'vertices': self.totals['vertices'],
+            'vertices_per_feature': {
+                'min': self.min_vertices,
+                'mean': self.totals['vertices'] / with_geometry if with_geometry else None,
+                'max': self.max_vertices,
+                'max_feature': self.max_vertices_feature,
+            },
+            'parts': self.totals['parts'],
+            'rings': self.totals['rings'],
+            'holes': self.totals['holes'],
+            'unclosed_rings': self.totals['unclosed_rings'],
+            'bbox': bbox if bbox[0] <= bbox[2] else None,
+        }
+
+
+# ---------- profiling ----------
+
+def profile_geojson(filepath, chunk_size=CHUNK_SIZE):
+    """
+    Profile a GeoJSON FeatureCollection in one pass.
+
+    Returns:
+        dict: Report with 'features', 'properties' (per key), 'geometry', 'location_keys' and 'samples'
+    """
+    start = time.perf_counter()
+    keys = {}
+    geometry = GeometryStats()
+    samples = []
+    invalid = []
+    count = 0
+    for index, raw in enumerate(iter_features(filepath, chunk_size)):
+        try:
+            feature = _feature_decoder.decode(raw)
+        except msgspec.DecodeError as e:
+            if len(invalid) < 10:
+                invalid.append({'feature': index, 'error': str(e)})
+            continue
+        count += 1
+        properties = feature.properties or {}
+        for key, value in properties.items():
+            stats = keys.get(key)
+            if stats is None:
+                stats = keys[key] = KeyStats()
+            stats.add(value)
+        geometry.add(feature.geometry, index)
+        if len(samples) < SAMPLE_FEATURES:
+            samples.append(properties)
+
+    location_keys = [key for key in keys if any(term in key.lower() for term in LOCATION_TERMS)]
+    return {
+        'file': str(filepath),
+        'features': count,
+        'invalid_features': invalid,
+        'properties': {key: stats.report(count) for key, stats in keys.items()},
+        'geometry': geometry.report(count),
+        'location_keys': location_keys,
+        'samples': samples,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def format_report(report):
+    """Human-readable version of a profile_geojson() report"""
+    lines = [f"=== GEOJSON PROFILE: {report['file']} ===", "",
+             f"Features: {report['features']} (profiled in {report['seconds']:.2f}s)"]
+    if report['invalid_features']:
+        lines.append(f"❌ Features that could not be decoded: {report['invalid_features']}")
+
+    g = report['geometry']
+    per = g['vertices_per_feature']
+    lines += ["", "GEOMETRY", "-" * 50,
+              f"Types: {g['types']}  null: {g['nulls']}  empty: {g['empty']}",
+              f"Vertices: {g['vertices']} (per feature min {per['min']}, "
+              f"mean {per['mean'] if per['mean'] is None else round(per['mean'], 1)}, "
+              f"max {per['max']} at feature {per['max_feature']})",
+              f"Parts: {g['parts']}  rings: {g['rings']}  holes: {g['holes']}  unclosed rings: {g['unclosed_rings']}",
+              f"BBox: {g['bbox']}"]
+
+    lines += ["", "PROPERTIES", "-" * 50]
+    for key, stats in report['properties'].items():
+        problems = []
+        if stats['nulls']:
+            problems.append(f"{stats['nulls']} null")
+        if stats['missing']:
+            problems.append(f"{stats['missing']} missing")
+        if stats['padded_strings']:
+            problems.append(f"{stats['padded_strings']} with surrounding spaces")
+        nested = sum(stats['types'].get(t, 0) for t in ('list', 'dict'))
+        if nested:
+            problems.append(f"{nested} list/dict")
+        lines.append(f"'{key}': {stats['types']} ~{stats['distinct_estimate']} distinct"
+                     + (f"  ⚠️ {', '.join(problems)}" if problems else ""))
+        if stats['numeric_range']:
+            lines.append(f"    range: {stats['numeric_range']}")
+        if stats['string_length']:
+            lines.append(f"    length: {stats['string_length']}")
+        # Skip values whose count could be all error, as in near-unique columns
+        top = ", ".join(f"{item['value']!r} ({item['count']})" for item in stats['top_values'][:5]
+                        if item['count'] - item['error'] >= 2)
+        if top:
+            lines.append(f"    top: {top}")
+
+    lines += ["", "LOCATION NAME COLUMNS", "-" * 50]
+    if report['location_keys']:
+        for key in report['location_keys']:
+            lines.append(f"'{key}': ~{report['properties'][key]['distinct_estimate']} distinct values")
+    else:
+        lines.append("No obvious location columns found!")
+
+    lines += ["", f"SAMPLE DATA (first {len(report['samples'])} features)", "-" * 50]
+    for i, properties in enumerate(report['samples']):
+        lines.append(f"Feature {i}:")
+        lines += [f"  {key}: {value!r}" for key, value in properties.items()]
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report, name="geojson_report"):
+    """Save a report as '<name>.json' and '<name>.txt'"""
+    with open(f"{name}.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    with open(f"{name}.txt", 'w', encoding='utf-8') as f:
+        f.write(format_report(report))
+    return f"{name}.json", f"{name}.txt"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        report = profile_geojson(sys.argv[1])
+        print(format_report(report))
+        saved = write_report(report, sys.argv[2] if len(sys.argv) > 2 else "geojson_report")
+        print(f"✅ Report saved to {' and '.join(saved)}")
+    else:
+        print("Usage: python geojson_profile.py <file.geojson> [report_name]")